@@ -20,12 +20,12 @@ _AGGTREELIMBS = dict()
 _AGGLIMBS = dict()
 
 # Bring some often used objects into the current namespace
-from .manipulators import discover
+from .manipulators import discover, idiscover
 from .treants import Treant
 from .trees import Veg, Leaf, Tree
 from .collections import View, Bundle
 from . import attach
 
-__all__ = ['Treant', 'Tree', 'Leaf', 'Bundle', 'discover', 'Veg',
-           'attach', 'View']
+__all__ = ['Treant', 'Tree', 'Leaf', 'Bundle', 'discover', 'idiscover',
+           'Veg', 'attach', 'View']
 __version__ = "0.8.0-dev"  # NOTE: keep in sync with RELEASE in setup.py
@@ -10,7 +10,6 @@ from fuzzywuzzy import process
 from six import string_types, with_metaclass
 
 from . import _AGGTREELIMBS, _AGGLIMBS
-from .collections import Bundle
 from .limbs import Tags, Categories
 
 
@@ -49,6 +48,44 @@ class AggLimb(with_metaclass(_AggLimbmeta, object)):
     def __init__(self, collection):
         self._collection = collection
 
+    def _read_members(self, function, workers=None, members=None):
+        return self._collection._read_members(function, workers=workers,
+                                              members=members)
+
+
+def _bits(bitmap, n):
+    """Get a list of booleans giving the first `n` bits of `bitmap`, starting
+    with the least significant.
+
+    """
+    return [bit == '1' for bit in '{:0{}b}'.format(bitmap, n)[::-1][:n]]
+
+
+def _fromarrays(index, uuids, names, arrays, kind):
+    """Build a record array of member uuids and the given fields.
+
+    Raises ``ValueError`` if any of `names` is the name given to the uuid
+    field, `index`.
+
+    """
+    import numpy as np
+
+    if index in names:
+        raise ValueError("A {} is named '{}', the same as the field of "
+                         "member uuids; give another name for it with "
+                         "`index`".format(kind, index))
+
+    return np.rec.fromarrays([uuids] + arrays, names=[index] + list(names))
+
+
+def _import_pandas():
+    try:
+        import pandas
+    except ImportError:
+        raise ImportError("The pandas package is required for building "
+                          "DataFrames")
+    return pandas
+
 
 @functools.total_ordering
 class AggTags(AggLimb):
@@ -60,6 +97,14 @@ class AggTags(AggLimb):
     def __init__(self, collection):
         super(AggTags, self).__init__(collection)
 
+        # inverted index of tags, with bitmaps of member positions as values;
+        # the uuids, state file stamps, and tags of the members it was built
+        # from are kept to update it as members change
+        self._bitmaps = dict()
+        self._uuids = list()
+        self._stamps = list()
+        self._membertags = list()
+
     def __repr__(self):
         return "<AggTags({})>".format(list(self.all))
 
@@ -97,7 +142,27 @@ class AggTags(AggLimb):
         return len(self.all)
 
     def __getitem__(self, value):
-        return [member.tags[value] for member in self._collection]
+        return _bits(self._match(value, self._index()), len(self._uuids))
+
+    def aget(self, value):
+        """Get whether each member matches a tag expression, without blocking
+        the event loop.
+
+        For use with :mod:`asyncio`; use as
+        ``matches = await b.tags.aget(value)``.
+
+        Parameters
+        ----------
+        value : str, list, tuple, or set
+            Tag expression, as for indexing.
+
+        Returns
+        -------
+        Future
+            Awaitable giving booleans for each member, in member order.
+
+        """
+        return self._collection._run_async(self.__getitem__, value)
 
     def __eq__(self, other):
         if isinstance(other, (AggTags, Tags, set)):
@@ -190,20 +255,201 @@ class AggTags(AggLimb):
         """Set of tags present among at least one Treant in collection.
 
         """
-        tags = [set(member.tags) for member in self._collection]
-        out = set.union(*tags)
-
-        return out
+        return set(self._index())
 
     @property
     def all(self):
         """Set of tags present among all Treants in collection.
 
         """
-        tags = [set(member.tags) for member in self._collection]
-        out = set.intersection(*tags)
+        bitmaps = self._index()
+        full = (1 << len(self._uuids)) - 1
 
-        return out
+        return set(tag for tag, bitmap in bitmaps.items() if bitmap == full)
+
+    @staticmethod
+    def _get_stamp(member):
+        # state held in memory, such as within a transaction, may differ from
+        # the state file on disk; ``None`` marks the member as changed
+        backend = member._backend
+        if backend.fdlock or backend._stamp is None:
+            return None
+        return backend._get_stamp()
+
+    @staticmethod
+    def _read_tags(member):
+        with member._read:
+            return member._backend._stamp, set(member._state['tags'])
+
+    def _index(self, members=None):
+        """Get the inverted index of tags among members.
+
+        The index is updated first from the state files of any members that
+        have changed since it was last used.
+
+        Returns
+        -------
+        dict
+            Bitmaps of member positions for each tag present, with tags as
+            keys.
+
+        """
+        if members is None:
+            members = list(self._collection)
+
+        uuids = [member.uuid for member in members]
+        if uuids != self._uuids:
+            self._bitmaps = dict()
+            self._uuids = uuids
+            self._stamps = [None] * len(uuids)
+            self._membertags = [set() for uuid in uuids]
+
+        stamps = self._read_members(self._get_stamp, members=members)
+        changed = [i for i, stamp in enumerate(stamps)
+                   if stamp is None or stamp != self._stamps[i]]
+
+        for i, (stamp, tags) in zip(changed, self._read_members(
+                self._read_tags, members=[members[i] for i in changed])):
+            self._update(i, stamp, tags)
+
+        return self._bitmaps
+
+    def _update(self, position, stamp, tags):
+        """Update the inverted index with the tags of a single member.
+
+        """
+        bit = 1 << position
+        oldtags = self._membertags[position]
+
+        for tag in oldtags - tags:
+            self._bitmaps[tag] &= ~bit
+            if not self._bitmaps[tag]:
+                del self._bitmaps[tag]
+
+        for tag in tags - oldtags:
+            self._bitmaps[tag] = self._bitmaps.get(tag, 0) | bit
+
+        self._stamps[position] = stamp
+        self._membertags[position] = tags
+
+    def _refresh(self, members):
+        """Update the inverted index after writing to the given members.
+
+        Their tags were just written, so reading them back doesn't require
+        deserializing their state files again.
+
+        """
+        if [member.uuid for member in members] != self._uuids:
+            return
+
+        for i, member in enumerate(members):
+            self._update(i, *self._read_tags(member))
+
+    def _match(self, value, bitmaps):
+        """Get the bitmap of members matching a tag expression.
+
+        As for ``Tags.__getitem__``, a list requires all of the tags, a tuple
+        any of the tags, and a set the absence of at least one of the tags;
+        these can be nested.
+
+        """
+        full = (1 << len(self._uuids)) - 1
+
+        if isinstance(value, list):
+            mask = full
+            for item in value:
+                mask &= self._match(item, bitmaps)
+        elif isinstance(value, tuple):
+            mask = 0
+            for item in value:
+                mask |= self._match(item, bitmaps)
+        elif isinstance(value, set):
+            mask = full & ~self._match(list(value), bitmaps)
+        elif isinstance(value, string_types):
+            mask = bitmaps.get(value, 0)
+        else:
+            raise TypeError("Tag expression must be a string, or a list, "
+                            "tuple, or set of them")
+
+        return mask
+
+    def _member_tags(self, workers=None):
+        """Get the tags of each member, reading each state file once.
+
+        """
+        return self._read_members(lambda member: member.tags._list(),
+                                  workers=workers)
+
+    def _table(self, tags=None, workers=None):
+        membertags = [set(tags) for tags in self._member_tags(workers)]
+        if tags is None:
+            tags = sorted(set.union(set(), *membertags))
+
+        return tags, [[tag in mtags for mtags in membertags]
+                      for tag in tags]
+
+    def to_frame(self, tags=None, workers=None):
+        """Get a DataFrame giving the presence of tags among members.
+
+        Each member's state file is read only once. Requires ``pandas``.
+
+        Parameters
+        ----------
+        tags : list
+            Tags to give columns for; defaults to all tags present among
+            members.
+        workers : int
+            Number of threads to use for reading state files; defaults to
+            the collection's setting.
+
+        Returns
+        -------
+        DataFrame
+            Boolean columns for each tag, indexed by member uuid.
+
+        """
+        pd = _import_pandas()
+        tags, columns = self._table(tags, workers)
+
+        return pd.DataFrame(dict(zip(tags, columns)), columns=tags,
+                            index=pd.Index(self._collection.uuids,
+                                           name='uuid'))
+
+    def to_records(self, tags=None, workers=None, index='uuid'):
+        """Get a NumPy record array giving the presence of tags among members.
+
+        Each member's state file is read only once. Requires ``numpy``.
+
+        Parameters
+        ----------
+        tags : list
+            Tags to give fields for; defaults to all tags present among
+            members.
+        workers : int
+            Number of threads to use for reading state files; defaults to
+            the collection's setting.
+        index : str
+            Name of the field giving member uuids.
+
+        Returns
+        -------
+        recarray
+            Record for each member, with a field of member uuids named
+            `index` and a boolean field for each tag.
+
+        Raises
+        ------
+        ValueError
+            If a tag has the same name as `index`.
+
+        """
+        import numpy as np
+
+        tags, columns = self._table(tags, workers)
+
+        return _fromarrays(index, self._collection.uuids, tags,
+                           [np.array(column, dtype=bool)
+                            for column in columns], 'tag')
 
     def add(self, *tags):
         """Add any number of tags to each Treant in collection.
@@ -213,9 +459,12 @@ class AggTags(AggLimb):
               Tags to add. Must be strings or lists of strings.
 
         """
-        for member in self._collection:
+        members = list(self._collection)
+        for member in members:
             member.tags.add(*tags)
 
+        self._refresh(members)
+
     def remove(self, *tags):
         """Remove tags from each Treant in collection.
 
@@ -226,16 +475,22 @@ class AggTags(AggLimb):
             *tags*
                 Tags to delete.
         """
-        for member in self._collection:
+        members = list(self._collection)
+        for member in members:
             member.tags.remove(*tags)
 
+        self._refresh(members)
+
     def clear(self):
         """Remove all tags from each Treant in collection.
 
         """
-        for member in self._collection:
+        members = list(self._collection)
+        for member in members:
             member.tags.clear()
 
+        self._refresh(members)
+
     def fuzzy(self, tag, threshold=80, scope='all'):
         """Get a tuple of existing tags that fuzzily match a given one.
 
@@ -289,8 +544,9 @@ class AggTags(AggLimb):
         Bundle
             Bundle of Treants matching the given tag expression.
         """
-        matches = self._collection.tags[tag]
-        return self._collection[matches]
+        matches = _bits(self._match(tag, self._index()), len(self._uuids))
+        return self._collection._subset([i for i, match in enumerate(matches)
+                                         if match])
 
 
 class AggCategories(AggLimb):
@@ -364,23 +620,169 @@ class AggCategories(AggLimb):
         if keys is None:
             return None
 
-        members = self._collection
         if isinstance(keys, (int, float, string_types, bool)):
-            k = keys
-            return [m.categories[k] if k in m.categories else None
-                    for m in members]
+            return self._columns([keys])[keys]
         elif isinstance(keys, list):
-            return [[m.categories[k] if k in m.categories else None
-                    for m in members]
-                    for k in keys]
+            columns = self._columns(keys)
+            return [columns[k] for k in keys]
         elif isinstance(keys, set):
-            return {k: [m.categories[k] if k in m.categories else None
-                    for m in members]
-                    for k in keys}
+            return self._columns(keys)
         else:
             raise TypeError("Key must be a string, list of strings, or set"
                             " of strings.")
 
+    def aget(self, keys):
+        """Get values for a given key, list of keys, or set of keys, without
+        blocking the event loop.
+
+        For use with :mod:`asyncio`; use as
+        ``values = await b.categories.aget(keys)``. Member state files are
+        read in a pool of threads as set for the collection.
+
+        Parameters
+        ----------
+        keys : str, list, set
+            Valid key(s) of Categories in this collection, as for indexing.
+
+        Returns
+        -------
+        Future
+            Awaitable giving values as for indexing.
+
+        """
+        return self._collection._run_async(self.__getitem__, keys)
+
+    def _member_categories(self, workers=None):
+        """Get the categories of each member, reading each state file once.
+
+        Parameters
+        ----------
+        workers : int
+            Number of threads to use for reading state files; defaults to
+            the collection's setting.
+
+        Returns
+        -------
+        list
+            Dict of categories for each member, in member order.
+
+        """
+        return self._read_members(lambda member: member.categories._dict(),
+                                  workers=workers)
+
+    def _table(self, keys=None, scope='any', workers=None):
+        categories = self._member_categories(workers)
+        if keys is None:
+            keys = sorted(self._keys(categories, scope)) if categories else []
+
+        return keys, self._columns(keys, categories)
+
+    def to_frame(self, keys=None, scope='any', workers=None):
+        """Get a DataFrame of category values among members.
+
+        Each member's state file is read only once. Requires ``pandas``.
+
+        Parameters
+        ----------
+        keys : list
+            Keys of categories to give columns for; defaults to the keys
+            within `scope`.
+        scope : {'all', 'any'}
+            Keys to use if `keys` isn't given. 'all' will use only keys found
+            within all Treants in the collection, while 'any' will use keys
+            found within at least one Treant in the collection.
+        workers : int
+            Number of threads to use for reading state files; defaults to
+            the collection's setting.
+
+        Returns
+        -------
+        DataFrame
+            Columns of values for each category, indexed by member uuid;
+            ``None`` is given for members without a category.
+
+        """
+        pd = _import_pandas()
+        keys, columns = self._table(keys, scope, workers)
+
+        return pd.DataFrame(columns, columns=keys,
+                            index=pd.Index(self._collection.uuids,
+                                           name='uuid'))
+
+    def to_records(self, keys=None, scope='any', workers=None,
+                   index='uuid'):
+        """Get a NumPy record array of category values among members.
+
+        Each member's state file is read only once. Requires ``numpy``.
+
+        Parameters
+        ----------
+        keys : list
+            Keys of categories to give fields for; defaults to the keys
+            within `scope`.
+        scope : {'all', 'any'}
+            Keys to use if `keys` isn't given. 'all' will use only keys found
+            within all Treants in the collection, while 'any' will use keys
+            found within at least one Treant in the collection.
+        workers : int
+            Number of threads to use for reading state files; defaults to
+            the collection's setting.
+        index : str
+            Name of the field giving member uuids.
+
+        Returns
+        -------
+        recarray
+            Record for each member, with a field of member uuids named
+            `index` and a field for each category; fields with values of
+            mixed types have object dtype, and ``None`` is given for members
+            without a category.
+
+        Raises
+        ------
+        ValueError
+            If a category key has the same name as `index`.
+
+        """
+        import numpy as np
+
+        keys, columns = self._table(keys, scope, workers)
+
+        # values of mixed types, including missing values, are kept as-is
+        arrays = list()
+        for key in keys:
+            column = columns[key]
+            if len(set(type(value) for value in column)) == 1:
+                arrays.append(np.array(column))
+            else:
+                arrays.append(np.array(column, dtype=object))
+
+        return _fromarrays(index, self._collection.uuids, keys, arrays,
+                           'category')
+
+    def _columns(self, keys, categories=None):
+        """Get the values of each of the given categories among all members.
+
+        Parameters
+        ----------
+        keys : iterable
+            Keys of categories to get values for.
+        categories : list
+            Dict of categories for each member, as given by
+            :meth:`_member_categories`; read from the members if not given.
+
+        Returns
+        -------
+        dict
+            Lists of values for each key, in member order, with keys as keys;
+            ``None`` is given for members without a category.
+
+        """
+        if categories is None:
+            categories = self._member_categories()
+
+        return {k: [cats.get(k) for cats in categories] for k in keys}
+
     def __setitem__(self, key, values):
         """Set the value of categories for each Treant in the collection.
 
@@ -443,12 +845,10 @@ class AggCategories(AggLimb):
         dict
             All unique Categories among members.
         """
-        keys = [set(member.categories.keys()) for member in self._collection]
-        keys = set.union(*keys)
+        categories = self._member_categories()
+        keys = set.union(*[set(cats) for cats in categories])
 
-        return {k: [m.categories[k] if k in m.categories else None
-                for m in self._collection]
-                for k in keys}
+        return self._columns(keys, categories)
 
     @property
     def all(self):
@@ -459,12 +859,10 @@ class AggCategories(AggLimb):
         dict
             Categories common to all members.
         """
-        keys = [set(member.categories.keys()) for member in self._collection]
-        keys = set.intersection(*keys)
+        categories = self._member_categories()
+        keys = set.intersection(*[set(cats) for cats in categories])
 
-        return {k: [m.categories[k] if k in m.categories else None
-                for m in self._collection]
-                for k in keys}
+        return self._columns(keys, categories)
 
     def add(self, categorydict=None, **categories):
         """Add any number of categories to each Treant in collection.
@@ -529,7 +927,11 @@ class AggCategories(AggLimb):
             Present keys.
 
         """
-        keys = [set(member.categories.keys()) for member in self._collection]
+        return self._keys(self._member_categories(), scope)
+
+    @staticmethod
+    def _keys(categories, scope):
+        keys = [set(cats) for cats in categories]
 
         if scope == 'all':
             out = set.intersection(*keys)
@@ -558,10 +960,13 @@ class AggCategories(AggLimb):
             the same order as the keys from ``AggCategories.keys``.
 
         """
-        keys = self.keys(scope=scope)
-        return self[keys]
+        categories = self._member_categories()
+        keys = self._keys(categories, scope)
+        columns = self._columns(keys, categories)
+
+        return [columns[k] for k in keys]
 
-    def groupby(self, keys):
+    def groupby(self, keys, indices=False, workers=None):
         """Return groupings of Treants based on values of Categories.
 
         If a single category is specified by `keys` (`keys` is neither a list
@@ -577,43 +982,47 @@ class AggCategories(AggLimb):
         each Bundle will have all of the category values specified by the tuple
         for that Bundle's key.
 
+        Each member's categories are read only once.
+
         Parameters
         ----------
         keys : str, list
             Valid key(s) of categories in this collection.
+        indices : bool
+            If ``True``, give the positions of the members of each group in
+            the collection instead of Bundles; these can be used to index the
+            collection.
+        workers : int
+            Number of threads to use for reading state files; defaults to
+            the collection's setting.
 
         Returns
         -------
         dict
-            Bundles of members by category values.
+            Bundles of members by category values; lists of member positions
+            if `indices` is ``True``.
         """
         if keys is None:
             return None
 
-        members = self._collection
         if isinstance(keys, (string_types)):
-            catvals = members.categories[keys]
-            groupkeys = [v for v in catvals if v is not None]
-            groups = {k: Bundle() for k in groupkeys}
-
-            k = keys
-            gen = ((m, m.categories[k]) for m in members if
-                   k in m.categories and m.categories[k] in groupkeys)
-            for m, catval in gen:
-                groups[catval].add(m)
-        # Note: redundant code in if/elif block can be consolidated in future
+            values = self._columns([keys],
+                                   self._member_categories(workers))[keys]
         elif isinstance(keys, list):
-            catvals = list(zip(*members.categories[keys]))
-            groupkeys = [v for v in catvals if None not in v]
-            groups = {k: Bundle() for k in groupkeys}
-
-            gen = ((i, m) for i, m in enumerate(members) if
-                   set(keys) <= set(m.categories) and
-                   tuple([m.categories[k] for k in keys]) in groupkeys)
-            for i, m in gen:
-                groups[catvals[i]].add(m)
-
+            columns = self._columns(keys, self._member_categories(workers))
+            values = [None if None in row else row
+                      for row in zip(*[columns[k] for k in keys])]
         else:
             raise TypeError("Keys must be a string or a list of"
                             " strings")
-        return groups
+
+        positions = dict()
+        for i, value in enumerate(values):
+            if value is not None:
+                positions.setdefault(value, list()).append(i)
+
+        if indices:
+            return positions
+
+        return {value: self._collection._subset(group)
+                for value, group in positions.items()}
@@ -8,6 +8,8 @@ datreant.backends --- low-level file backends
 =============================================
 
 """
-from .core import File, FileSerial
+from .core import (File, FileSerial, JSONFile, MsgpackFile,
+                   register_json_codec, get_json_codec)
 
-__all__ = ['File', 'FileSerial']
+__all__ = ['File', 'FileSerial', 'JSONFile', 'MsgpackFile',
+           'register_json_codec', 'get_json_codec']
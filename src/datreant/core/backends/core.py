@@ -2,8 +2,11 @@
 
 """
 
+import copy
 import json
 import os
+import threading
+from collections import OrderedDict
 from contextlib import contextmanager
 
 if os.name == 'nt':
@@ -11,6 +14,182 @@ if os.name == 'nt':
 else:
     import fcntl
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# registry of JSON codecs; names as keys, (loads, dumps) pairs working on bytes
+# as values, in order of preference
+_JSONCODECS = OrderedDict()
+
+
+def register_json_codec(name, loads, dumps):
+    """Register a JSON codec for use by :class:`JSONFile` backends.
+
+    :Arguments:
+        *name*
+            name to register the codec under
+        *loads*
+            function taking a ``bytes`` object and returning the deserialized
+            state
+        *dumps*
+            function taking a state and returning it serialized as ``bytes``
+
+    """
+    _JSONCODECS[name] = (loads, dumps)
+
+
+def get_json_codec(name=None):
+    """Get a registered JSON codec by name.
+
+    :Arguments:
+        *name*
+            name of the codec; if ``None``, the default codec is returned
+
+    :Returns:
+        *codec*
+            (loads, dumps) pair for the codec
+
+    """
+    if name is None:
+        name = default_json_codec
+
+    try:
+        return _JSONCODECS[name]
+    except KeyError:
+        raise ValueError("No such JSON codec '{}'; available codecs are "
+                         "{}".format(name, list(_JSONCODECS)))
+
+
+def _bytes_codec(loads, dumps):
+    """Wrap a codec working on text so that it works on UTF-8 encoded bytes.
+
+    """
+    return (lambda data: loads(data.decode('utf-8')),
+            lambda state: dumps(state).encode('utf-8'))
+
+
+def _fallback_codec(loads, dumps, nonfinite_null=False):
+    """Wrap a codec so that data it can't handle falls back to the standard
+    library.
+
+    Fast JSON libraries reject some data the standard library accepts, such
+    as ``NaN`` or integers beyond 64 bits. Some instead write non-finite
+    floats as ``null``, losing them; for these, give `nonfinite_null`, and
+    any output containing ``null`` is written by the standard library
+    instead.
+
+    """
+    std_loads, std_dumps = _bytes_codec(json.loads, json.dumps)
+
+    def fallback_loads(data):
+        try:
+            return loads(data)
+        except (ValueError, OverflowError):
+            return std_loads(data)
+
+    def fallback_dumps(state):
+        try:
+            data = dumps(state)
+        except (TypeError, ValueError, OverflowError):
+            return std_dumps(state)
+
+        if nonfinite_null and b'null' in data:
+            return std_dumps(state)
+        return data
+
+    return fallback_loads, fallback_dumps
+
+
+def _register_available_json_codecs():
+    """Register whichever of the known fast JSON libraries are installed,
+    fastest first, and the standard library codec.
+
+    """
+    try:
+        import orjson
+    except ImportError:
+        pass
+    else:
+        # orjson writes ``NaN`` and infinities as ``null``
+        register_json_codec('orjson', *_fallback_codec(
+            orjson.loads, orjson.dumps, nonfinite_null=True))
+
+    try:
+        import rapidjson
+    except ImportError:
+        pass
+    else:
+        register_json_codec('rapidjson', *_fallback_codec(
+            *_bytes_codec(rapidjson.loads, rapidjson.dumps)))
+
+    try:
+        import ujson
+    except ImportError:
+        pass
+    else:
+        register_json_codec('ujson', *_fallback_codec(
+            *_bytes_codec(ujson.loads, ujson.dumps)))
+
+    register_json_codec('json', *_bytes_codec(json.loads, json.dumps))
+
+
+_register_available_json_codecs()
+
+# codec used by JSONFile backends when none is specified: the fastest one
+# installed, since all fall back to the standard library for data they can't
+# round-trip
+default_json_codec = next(iter(_JSONCODECS))
+
+
+def merge_state(base, new, current):
+    """Apply the changes made from one state to another onto a third.
+
+    Dicts are merged key by key, and lists of hashable items, such as tags,
+    are merged as sets; other values changed are replaced.
+
+    :Arguments:
+        *base*
+            state the changes were made from
+        *new*
+            state with the changes made
+        *current*
+            state to apply the changes to
+
+    :Returns:
+        *merged*
+            `current` with the changes applied
+    """
+    if new == base:
+        return current
+
+    if all(isinstance(state, dict) for state in (base, new, current)):
+        merged = dict(current)
+        for key in set(base).union(new):
+            if key not in new:
+                merged.pop(key, None)
+            elif key not in base or key not in current:
+                merged[key] = new[key]
+            else:
+                merged[key] = merge_state(base[key], new[key], current[key])
+        return merged
+
+    if all(isinstance(state, list) for state in (base, new, current)):
+        try:
+            removed = set(base).difference(new)
+            added = set(new).difference(base)
+            merged = [item for item in current if item not in removed]
+            kept = set(merged)
+        except TypeError:
+            return new
+        merged.extend(item for item in new
+                      if item in added and item not in kept)
+        return merged
+
+    return new
+
 
 class File(object):
     """Generic File object base class. Implements file locking and reloading
@@ -35,6 +214,10 @@ class File(object):
         self.fd = None
         self.fdlock = None
 
+        # advisory locks are held by the process, so threads using this
+        # object must also take turns
+        self._threadlock = threading.RLock()
+
         # we apply locks to a proxy file to avoid creating an HDF5 file
         # without an exclusive lock on something; important for multiprocessing
         proxy = "." + os.path.basename(self.filename) + ".proxy"
@@ -172,6 +355,16 @@ class File(object):
         self._exlock(self.fd)
         self.fdlock = 'exclusive'
 
+    def _held(self):
+        """Check whether the calling thread holds a lock on the file.
+
+        :Returns:
+            *held*
+                ``True`` if the calling thread holds a shared or exclusive
+                lock
+        """
+        return bool(self.fdlock) and self._threadlock._is_owned()
+
     def _release_lock(self):
         """Apply exclusive lock.
 
@@ -182,34 +375,36 @@ class File(object):
 
     @contextmanager
     def read(self):
-        # if we already have any lock, proceed
-        if self.fdlock:
-            yield self.handle
-        else:
-            self._apply_shared_lock()
-            try:
-                # open the file using the actual reader
-                self.handle = self._open_file_r()
+        with self._threadlock:
+            # if we already have any lock, proceed
+            if self.fdlock:
                 yield self.handle
-            finally:
-                self.handle.close()
-                self._release_lock()
+            else:
+                self._apply_shared_lock()
+                try:
+                    # open the file using the actual reader
+                    self.handle = self._open_file_r()
+                    yield self.handle
+                finally:
+                    self.handle.close()
+                    self._release_lock()
 
     @contextmanager
     def write(self):
-        # if we already have an exclusive lock, proceed
-        if self.fdlock == 'exclusive':
-            yield self.handle
-        else:
-            self._apply_exclusive_lock()
-
-            # open the file using the actual writer
-            self.handle = self._open_file_w()
-            try:
+        with self._threadlock:
+            # if we already have an exclusive lock, proceed
+            if self.fdlock == 'exclusive':
                 yield self.handle
-            finally:
-                self.handle.close()
-                self._release_lock()
+            else:
+                self._apply_exclusive_lock()
+
+                # open the file using the actual writer
+                self.handle = self._open_file_w()
+                try:
+                    yield self.handle
+                finally:
+                    self.handle.close()
+                    self._release_lock()
 
     def _open_r(self):
         """Open file with intention to write.
@@ -258,7 +453,20 @@ class File(object):
 class FileSerial(File):
     """File object base class for serialization formats, such as JSON.
 
+    Subclasses set `_ext` to the file extension used for their format.
+
+    The deserialized state is kept in memory along with a stamp of the file
+    it was read from (modification time, size, and inode). Subsequent reads
+    only deserialize the file again if this stamp has changed.
+
     """
+    def __init__(self, filename, **kwargs):
+        super(FileSerial, self).__init__(filename, **kwargs)
+        self._stamp = None
+
+        # state that buffered changes were made from; ``None`` if changes
+        # aren't being buffered
+        self._base = None
 
     @property
     def _writebuffer(self):
@@ -287,39 +495,105 @@ class FileSerial(File):
 
     @contextmanager
     def read(self):
-        # if we already have any lock, proceed
-        if self.fdlock:
-            yield self._state
-        else:
-            self._apply_shared_lock()
-            try:
-                self._pull_state()
+        with self._threadlock:
+            # if we already have any lock or are buffering changes, proceed
+            if self.fdlock or self._base is not None:
                 yield self._state
-            finally:
-                self._release_lock()
+            else:
+                self._apply_shared_lock()
+                try:
+                    self._pull_state()
+                    yield self._state
+                finally:
+                    self._release_lock()
 
     @contextmanager
     def write(self):
-        # if we already have an exclusive lock, proceed
-        if self.fdlock == 'exclusive':
-            yield self._state
-        else:
-            self._apply_exclusive_lock()
-            try:
-                self._pull_state()
-            except IOError:
-                self._init_state()
-            try:
+        with self._threadlock:
+            # if we already have an exclusive lock or are buffering changes,
+            # proceed
+            if self.fdlock == 'exclusive' or self._base is not None:
                 yield self._state
-                self._push_state()
-            finally:
-                self._release_lock()
+            else:
+                self._apply_exclusive_lock()
+                try:
+                    self._pull_state()
+                except IOError:
+                    self._init_state()
+                try:
+                    # in-memory state can't be trusted until it is pushed
+                    self._stamp = None
+                    yield self._state
+                    self._push_state()
+                finally:
+                    self._release_lock()
+
+    def _buffer(self):
+        """Start holding changes to the state in memory.
+
+        Reads and writes use the state in memory, without locking or touching
+        the state file, until :meth:`_unbuffer` is called. The state should
+        have just been read.
+
+        :Returns:
+            *started*
+                ``False`` if changes were already being buffered
+        """
+        with self._threadlock:
+            if self._base is not None:
+                return False
+
+            self._base = copy.deepcopy(self._state)
+
+            # in-memory state can't be trusted until it is pushed
+            self._stamp = None
+            return True
+
+    def _unbuffer(self):
+        """Stop holding changes to the state in memory.
+
+        The buffered changes aren't written; apply them with
+        :func:`merge_state` within :meth:`write` to keep them.
+
+        :Returns:
+            *base*
+                state the changes were made from
+            *state*
+                state with the changes made
+        """
+        with self._threadlock:
+            base, self._base = self._base, None
+            self._stamp = None
+            return base, self._state
+
+    def _get_stamp(self):
+        """Get stamp identifying the current version of the file on disk.
+
+        :Returns:
+            *stamp*
+                tuple of modification time, size, and inode of the file;
+                ``None`` if the file doesn't exist
+        """
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            return None
+
+        mtime = getattr(st, 'st_mtime_ns', st.st_mtime)
+        return (mtime, st.st_size, st.st_ino)
 
     def _pull_state(self):
+        # skip deserialization if file unchanged since our last pull or push
+        stamp = self._get_stamp()
+        if stamp is not None and stamp == self._stamp:
+            return
+
         self.handle = self._open_file_r()
         self._state = self._deserialize(self.handle)
         self.handle.close()
 
+        self._stamp = stamp
+
     def _deserialize(self, handle):
         """Deserialize full state from open file handle.
 
@@ -339,6 +613,8 @@ class FileSerial(File):
         else:
             os.rename(self._writebuffer, self.filename)
 
+        self._stamp = self._get_stamp()
+
     def _serialize(self, state, handle):
         """Serialize full state to open file handle.
 
@@ -348,8 +624,65 @@ class FileSerial(File):
 
 
 class JSONFile(FileSerial):
+    """File object base class for JSON state files.
+
+    :Arguments:
+        *filename*
+            name of file on disk object corresponds to
+
+    :Keywords:
+        *codec*
+            name of registered JSON codec to use for this file; if ``None``,
+            the default codec is used
+
+    """
+    _ext = 'json'
+
+    def __init__(self, filename, codec=None, **kwargs):
+        super(JSONFile, self).__init__(filename, **kwargs)
+        self._loads, self._dumps = get_json_codec(codec)
+
+    def _open_file_r(self):
+        return open(self.filename, 'rb')
+
+    def _open_file_w(self):
+        return open(self._writebuffer, 'wb')
+
+    def _deserialize(self, handle):
+        return self._loads(handle.read())
+
+    def _serialize(self, state, handle):
+        handle.write(self._dumps(state))
+
+
+class MsgpackFile(FileSerial):
+    """File object base class for msgpack state files.
+
+    Requires the optional `msgpack` package.
+
+    :Arguments:
+        *filename*
+            name of file on disk object corresponds to
+
+    """
+    _ext = 'msgpack'
+
+    def __init__(self, filename, **kwargs):
+        if msgpack is None:
+            raise ImportError("The msgpack package is required for msgpack "
+                              "state files")
+        # JSON codec has no meaning here
+        kwargs.pop('codec', None)
+        super(MsgpackFile, self).__init__(filename, **kwargs)
+
+    def _open_file_r(self):
+        return open(self.filename, 'rb')
+
+    def _open_file_w(self):
+        return open(self._writebuffer, 'wb')
+
     def _deserialize(self, handle):
-        return json.load(handle)
+        return msgpack.unpackb(handle.read(), raw=False)
 
     def _serialize(self, state, handle):
-        json.dump(state, handle)
+        handle.write(msgpack.packb(state, use_bin_type=True))
@@ -6,13 +6,19 @@ Interface classes for state files.
 import os
 import warnings
 
-from .core import JSONFile
+from .core import JSONFile, MsgpackFile
+from ..index import update_index
 
 
 def treantfile(filename, **kwargs):
     """Generate or regenerate the appropriate treant file instance from
     filename.
 
+    The state file class used is that of the treant type given in the
+    filename, unless the filename's extension corresponds to a different
+    format; in that case, the generic state file class for that format is
+    used.
+
     :Arguments:
         *filename*
             path to state file (existing or to be created), including the
@@ -25,19 +31,89 @@ def treantfile(filename, **kwargs):
     """
     from .. import _TREANTS
 
-    treanttype = os.path.basename(filename).split(os.extsep)[0]
+    parts = os.path.basename(filename).split(os.extsep)
+    treanttype, ext = parts[0], parts[-1]
 
     try:
-        statefileclass = _TREANTS[treanttype]._backendclass
+        treantclass = _TREANTS[treanttype]
     except KeyError:
         warnings.warn("No known treant type for file '{}'; "
                       "defaulting to TreantFile".format(filename))
-        statefileclass = _TREANTS['Treant']._backendclass
+        treantclass = _TREANTS['Treant']
+
+    statefileclass = treantclass._backendclass
+    if statefileclass._ext != ext:
+        try:
+            statefileclass = _STATEFILES[ext]
+        except KeyError:
+            raise ValueError("No known state file format for file "
+                             "'{}'".format(filename))
+
+    kwargs.setdefault('codec', treantclass._jsoncodec)
 
     return statefileclass(filename, **kwargs)
 
 
-class TreantFile(JSONFile):
+def convert_treantfile(filename, ext):
+    """Convert a treant state file to the format with the given extension.
+
+    The new state file is written alongside the existing one, which is then
+    removed. An exclusive lock is held on the existing state file throughout.
+
+    :Arguments:
+        *filename*
+            path to existing state file
+        *ext*
+            extension of the state file format to convert to, e.g. 'json' or
+            'msgpack'
+
+    :Returns:
+        *newfilename*
+            path to the converted state file
+
+    """
+    if ext not in _STATEFILES:
+        raise ValueError("No known state file format with extension "
+                         "'{}'".format(ext))
+
+    oldfile = treantfile(filename)
+    if oldfile._ext == ext:
+        return oldfile.filename
+
+    newfilename = os.extsep.join(
+            [os.path.splitext(oldfile.filename)[0], ext])
+
+    oldfile._apply_exclusive_lock()
+    try:
+        oldfile._pull_state()
+
+        newfile = _STATEFILES[ext](newfilename)
+        with newfile.write() as state:
+            state.update(oldfile._state)
+
+        os.remove(oldfile.filename)
+        os.remove(oldfile.proxy)
+    finally:
+        oldfile._release_lock()
+
+    return newfilename
+
+
+class TreantFileMixin(object):
+    """Functionality common to Treant state files of all formats.
+
+    """
+    def _init_state(self):
+        self._state = dict()
+
+    def _push_state(self):
+        super(TreantFileMixin, self)._push_state()
+
+        # keep any index covering this Treant current
+        update_index(self.filename, self._state)
+
+
+class TreantFile(TreantFileMixin, JSONFile):
     """Treant state file.
 
     This is the base class for all Treant state files. It generates data
@@ -49,5 +125,21 @@ class TreantFile(JSONFile):
             path to file
 
     """
-    def _init_state(self):
-        self._state = dict()
+
+
+class TreantMsgpackFile(TreantFileMixin, MsgpackFile):
+    """Treant state file stored in the msgpack binary format.
+
+    Use as a Treant's `_backendclass` for smaller state files that are
+    faster to parse. Requires the optional `msgpack` package.
+
+    :Arguments:
+        *filename*
+            path to file
+
+    """
+
+
+# state file classes used for each format, with file extensions as keys
+_STATEFILES = {TreantFile._ext: TreantFile,
+               TreantMsgpackFile._ext: TreantMsgpackFile}
@@ -8,19 +8,35 @@ conveniences for Trees and Leaves.
 
 from __future__ import absolute_import
 
+import bisect
 import fnmatch
 import functools
 import glob
-import multiprocessing as mp
+import itertools
 import os
-from collections import defaultdict
+import pickle
+import threading
+import time
+import traceback
+from array import array
+from collections import deque, namedtuple
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, TimeoutError, wait)
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 
 from six import string_types
-from six.moves import zip
+from six.moves import range, zip
 
 from . import _AGGLIMBS, _AGGTREELIMBS
 from . import findTreants
+from .backends.core import merge_state
 from .trees import Tree, Leaf
+from .util import run_async, run_inline
+
+# number of threads Bundles use for reading the state files of their members
+# in aggregate, unless set for a Bundle with its `workers` attribute
+WORKERS = 1
 
 
 @functools.total_ordering
@@ -101,6 +117,142 @@ class CollectionMixin(object):
             if isinstance(member, Tree):
                 member.draw(depth=depth, hidden=hidden)
 
+    def map(self, function, processes=1, executor=None, chunksize=None,
+            on_error='raise', retries=0, timeout=None, **kwargs):
+        """Apply a function to each member, perhaps in parallel.
+
+        A pool of processes is created for `processes` > 1; for example,
+        with 40 members and ``processes=4``, 4 processes will be created.
+        Members are sent to the processes in chunks, and when each process
+        completes work on a chunk, it grabs another, until no members remain.
+
+        An existing :class:`concurrent.futures.Executor` can be given instead
+        to avoid starting new processes each time.
+
+        With ``on_error='collect'``, a failure for one member doesn't stop
+        work on the others; each is reported as a :class:`MapFailure` along
+        with the results instead. A function raising an exception for a
+        member is tried again up to `retries` times. With a `timeout`, a
+        member not done in time, or whose worker process dies, is also given
+        up on; the processes of a pool created for the call are then killed
+        and replaced, and the member is sent again up to `retries` times.
+
+        `kwargs` are passed to the given function when applied to each member
+
+        Parameters
+        ----------
+        function : function
+            Function to apply to each member. Must take only a single member
+            as input, but may take any number of keyword arguments.
+        processes : int
+            How many processes to use. If 1, applies function to each member in
+            member order in serial.
+        executor : Executor
+            Executor to use instead of creating a pool of processes, such as a
+            :class:`concurrent.futures.ProcessPoolExecutor` that is reused
+            across calls; `processes` is ignored if given. Hung workers of a
+            given executor are not killed.
+        chunksize : int
+            Number of members sent to the executor at a time; by default,
+            members are split into about four chunks per worker, or sent one
+            at a time if `timeout` is given.
+        on_error : {'raise', 'collect'}
+            Whether to raise the first failure, or to collect failures and
+            carry on.
+        retries : int
+            Number of times to try again for a member that fails.
+        timeout : float
+            Seconds to allow for each member when using processes or an
+            executor. ``None`` indicates no limit.
+
+        Returns
+        -------
+        results : list
+            List giving the result of the function for each member, in member
+            order. If the function returns ``None`` for each member, then only
+            ``None`` is returned instead of a list.
+        failures : list
+            With ``on_error='collect'``, results are given as a tuple along
+            with a list of :class:`MapFailure` for each member that failed,
+            in member order; ``None`` is given as the result for these members.
+        """
+        results = list()
+        failures = list()
+        for member, result in self._imap(
+                function, kwargs, processes=processes, executor=executor,
+                chunksize=chunksize, on_error=on_error, retries=retries,
+                timeout=timeout):
+            if isinstance(result, MapFailure):
+                failures.append(result)
+                result = None
+            results.append(result)
+
+        # check if list is all ``None``: if so, we return ``None``
+        if all([(i is None) for i in results]):
+            results = None
+
+        if on_error == 'collect':
+            return results, failures
+        else:
+            return results
+
+    def imap(self, function, processes=1, executor=None, chunksize=None,
+             on_error='raise', retries=0, timeout=None, **kwargs):
+        """Apply a function to each member, perhaps in parallel, yielding
+        each member and its result in member order as they are done.
+
+        Takes the same arguments as :meth:`map`. Only a few chunks of members
+        per worker are given out at a time, so results can be used as they
+        come in without all of them being held in memory. With
+        ``on_error='collect'``, a :class:`MapFailure` is yielded as the
+        result for each member that failed.
+
+        Yields
+        ------
+        member, result : tuple
+            Each member and the result of the function for it.
+        """
+        for item in self._imap(function, kwargs, processes=processes,
+                               executor=executor, chunksize=chunksize,
+                               on_error=on_error, retries=retries,
+                               timeout=timeout):
+            yield item
+
+    def imap_unordered(self, function, processes=1, executor=None,
+                       chunksize=None, on_error='raise', retries=0,
+                       timeout=None, **kwargs):
+        """Apply a function to each member, perhaps in parallel, yielding
+        each member and its result as soon as they are done.
+
+        As :meth:`imap`, but results are yielded in the order they are
+        finished instead of in member order.
+
+        Yields
+        ------
+        member, result : tuple
+            Each member and the result of the function for it.
+        """
+        for item in self._imap(function, kwargs, ordered=False,
+                               processes=processes, executor=executor,
+                               chunksize=chunksize, on_error=on_error,
+                               retries=retries, timeout=timeout):
+            yield item
+
+    def _imap(self, function, kwargs, ordered=True, **options):
+        members = self._list()
+        for position, result in _imap(function,
+                                      self._descriptors(members, **options),
+                                      kwargs, ordered=ordered, **options):
+            if isinstance(result, MapFailure):
+                result = result._replace(member=members[position])
+            yield members[position], result
+
+    def _descriptors(self, members, **options):
+        """Get members as sent to other processes or threads for mapping.
+
+        """
+        return members
+
     @property
     def loc(self):
         """Get a View giving Tree/Leaf at `path` relative to each Tree in
@@ -455,54 +607,6 @@ class View(CollectionMixin):
         """
         return [member.exists for member in self]
 
-    def map(self, function, processes=1, **kwargs):
-        """Apply a function to each member, perhaps in parallel.
-
-        A pool of processes is created for `processes` > 1; for example,
-        with 40 members and ``processes=4``, 4 processes will be created,
-        each working on a single member at any given time. When each process
-        completes work on a member, it grabs another, until no members remain.
-
-        `kwargs` are passed to the given function when applied to each member
-
-        Parameters
-        ----------
-        function : function
-            Function to apply to each member. Must take only a single Treant
-            instance as input, but may take any number of keyword arguments.
-        processes : int
-            How many processes to use. If 1, applies function to each member in
-            member order in serial.
-
-        Returns
-        -------
-        results : list
-            List giving the result of the function for each member, in member
-            order. If the function returns ``None`` for each member, then only
-            ``None`` is returned instead of a list.
-        """
-        if processes > 1:
-            pool = mp.Pool(processes=processes)
-            results = dict()
-            results = {member.abspath: pool.apply_async(
-                    function, args=(member,), kwds=kwargs) for member in self}
-
-            output = {key: results[key].get() for key in results}
-
-            pool.close()
-            pool.join()
-
-            # sort by member order
-            results = [output[abspath] for abspath in self.abspaths]
-        else:
-            results = [function(member, **kwargs) for member in self]
-
-        # check if list is all ``None``: if so, we return ``None``
-        if all([(i is None) for i in results]):
-            results = None
-
-        return results
-
     def globfilter(self, pattern):
         """Return a View of members that match by name the given globbing
         pattern.
@@ -531,6 +635,176 @@ class View(CollectionMixin):
         return self
 
 
+def _uuid_key(uuid):
+    """Get the 16 bytes a uuid is stored as in a member table.
+
+    :Returns:
+        *key*
+            the uuid as bytes; ``None`` if `uuid` isn't a uuid string
+    """
+    try:
+        key = bytes.fromhex(uuid.replace('-', ''))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+    if len(key) != 16 or _uuid_str(key) != uuid:
+        return None
+    return key
+
+
+def _uuid_str(key):
+    """Get the uuid string for the 16 bytes it is stored as.
+
+    """
+    h = key.hex()
+    return '-'.join((h[:8], h[8:12], h[12:16], h[16:20], h[20:]))
+
+
+class _MemberTable(object):
+    """Member table of a Bundle, stored column-wise in compact arrays.
+
+    Uuids are stored as 16 bytes each in a bytearray. Treant types and the
+    directories containing members are stored as codes in arrays, indexing
+    lists of their distinct values, and member names as a list of strings.
+
+    Each field is read with ``table[field]``, giving a sequence of its values
+    in member order.
+
+    """
+    fields = ('uuid', 'treanttype', 'abspath')
+
+    def __init__(self):
+        self._uuids = bytearray()
+        self._typecodes = array('H')
+        self._dircodes = array('I')
+        self._names = list()
+
+        # distinct treant types and directories, and their codes
+        self._treanttypes = list()
+        self._dirs = list()
+        self._codes = ({}, {})
+
+    def __len__(self):
+        return len(self._names)
+
+    def __getitem__(self, field):
+        if field not in self.fields:
+            raise KeyError(field)
+        return _Column(self, field)
+
+    def _code(self, which, value):
+        values = (self._treanttypes, self._dirs)[which]
+        codes = self._codes[which]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def get(self, field, position):
+        """Get the value of a field for the member at a position.
+
+        """
+        if field == 'uuid':
+            return _uuid_str(self.key(position))
+        elif field == 'treanttype':
+            return self._treanttypes[self._typecodes[position]]
+        else:
+            return os.path.join(self._dirs[self._dircodes[position]],
+                                self._names[position])
+
+    def values(self, field):
+        """Get the values of a field for all members, in member order.
+
+        """
+        if field == 'uuid':
+            return [_uuid_str(key) for key in self.keys()]
+        elif field == 'treanttype':
+            treanttypes = self._treanttypes
+            return [treanttypes[code] for code in self._typecodes]
+        else:
+            dirs = self._dirs
+            return [os.path.join(dirs[code], name)
+                    for code, name in zip(self._dircodes, self._names)]
+
+    def key(self, position):
+        """Get the uuid of the member at a position as bytes.
+
+        """
+        return bytes(self._uuids[16 * position:16 * position + 16])
+
+    def keys(self):
+        """Get the uuids of all members as bytes, in member order.
+
+        """
+        data = bytes(self._uuids)
+        return [data[i:i + 16] for i in range(0, len(data), 16)]
+
+    def name(self, position):
+        return self._names[position]
+
+    def names(self):
+        return list(self._names)
+
+    def append(self, key, treanttype, abspath):
+        """Add a member; `abspath` must be normalized.
+
+        """
+        dirname, name = os.path.split(abspath)
+        self._uuids.extend(key)
+        self._typecodes.append(self._code(0, treanttype))
+        self._dircodes.append(self._code(1, dirname))
+        self._names.append(name)
+
+    def update(self, position, treanttype, abspath):
+        """Change the treant type and location of the member at a position.
+
+        """
+        dirname, name = os.path.split(abspath)
+        self._typecodes[position] = self._code(0, treanttype)
+        self._dircodes[position] = self._code(1, dirname)
+        self._names[position] = name
+
+    def take(self, positions):
+        """Get a new table of the members at the given positions, in order.
+
+        """
+        out = self.__class__()
+        out._treanttypes = list(self._treanttypes)
+        out._dirs = list(self._dirs)
+        out._codes = tuple(dict(codes) for codes in self._codes)
+
+        uuids = memoryview(self._uuids)
+        out._uuids = bytearray().join(uuids[16 * i:16 * i + 16]
+                                      for i in positions)
+        out._typecodes = array('H', (self._typecodes[i] for i in positions))
+        out._dircodes = array('I', (self._dircodes[i] for i in positions))
+        out._names = [self._names[i] for i in positions]
+
+        return out
+
+
+class _Column(object):
+    """Sequence of the values of one field of a member table.
+
+    """
+    def __init__(self, table, field):
+        self._table = table
+        self._field = field
+
+    def __len__(self):
+        return len(self._table)
+
+    def __getitem__(self, position):
+        position = range(len(self._table))[position]
+        if isinstance(position, range):
+            return [self._table.get(self._field, i) for i in position]
+        return self._table.get(self._field, position)
+
+    def __iter__(self):
+        return iter(self._table.values(self._field))
+
+
 class Bundle(CollectionMixin):
     """An ordered set of Treants.
 
@@ -543,6 +817,10 @@ class Bundle(CollectionMixin):
         Treants will be added to the collection.
     limbs : list or set
         Names of limbs to immediately attach.
+    workers : int
+        Number of threads to use for reading the state files of members in
+        aggregate, such as through ``Bundle.tags`` and ``Bundle.categories``;
+        defaults to ``datreant.core.collections.WORKERS``.
 
     """
     _memberpaths = ['abspath']
@@ -554,9 +832,23 @@ class Bundle(CollectionMixin):
 
     def __init__(self, *treants, **kwargs):
         self._cache = dict()
-        self._state = list()
         self._searchtime = 10
 
+        # member table, stored column-wise
+        self._state = _MemberTable()
+
+        # indexes into the member table: uuids as bytes to positions, and
+        # names to positions, or sorted lists of them for names shared by
+        # several members
+        self._uuidindex = dict()
+        self._nameindex = dict()
+
+        # held around changes to the member table, which a Watcher may make
+        # from another thread
+        self._lock = threading.RLock()
+
+        self.workers = kwargs.pop('workers', None)
+
         self.add(*treants)
 
         # attach any limbs given
@@ -570,6 +862,29 @@ class Bundle(CollectionMixin):
     def __repr__(self):
         return "<Bundle({})>".format(self._list())
 
+    def __len__(self):
+        return len(self._state)
+
+    def __contains__(self, item):
+        from .treants import Treant
+
+        if isinstance(item, Treant):
+            return self._position(item.uuid) is not None
+        else:
+            return item in self._list()
+
+    def __eq__(self, other):
+        if isinstance(other, Bundle):
+            return set(self._uuidindex) == set(other._uuidindex)
+        else:
+            return super(Bundle, self).__eq__(other)
+
+    def __lt__(self, other):
+        if isinstance(other, Bundle):
+            return set(self._uuidindex) < set(other._uuidindex)
+        else:
+            return super(Bundle, self).__lt__(other)
+
     def __str__(self):
         out = "<- Bundle ->\n"
 
@@ -594,29 +909,113 @@ class Bundle(CollectionMixin):
         # we can take lists of indices, names, or uuids; these return a
         # Bundle; repeats already not respected since Bundle functions as a
         # set
-        memberlist = self._list()
-
         if isinstance(index, string_types):
             # a name or uuid can be used for indexing
             # a name always returns a Bundle
-            out = Bundle([self.filepaths[i]
-                          for i, name in enumerate(self.names)
-                          if name == index],
-                         limbs=self.limbs)
-            # if no names match, we try uuids
-            if not len(out):
-                out = [member for member in self if member.uuid == index]
-                if not len(out):
-                    raise KeyError("No name or uuid matching string selection")
-                else:
-                    # we want to return a Treant, not a list for uuid matches
-                    out = out[0]
+            positions = self._named(index)
+            if positions:
+                # members matching may have been renamed since
+                self._refresh_locations(positions)
+                positions = self._named(index)
+
+            position = None if positions else self._position(index)
+            if position is not None:
+                # we want to return a Treant, not a Bundle for uuid matches
+                return self._member(position)
+            elif not positions:
+                # members may have been renamed to this name since they were
+                # added
+                self._refresh_locations()
+                positions = self._named(index)
+
+            if positions:
+                out = self._subset(positions)
+            else:
+                raise KeyError("No name or uuid matching string selection")
         elif isinstance(index, slice):
             # we also take slices, obviously
-            out = Bundle(*self.filepaths[index], limbs=self.limbs)
-            out._cache.update(self._cache)
+            out = self._subset(range(len(self))[index])
+        elif ((isinstance(index, list) and
+               all(isinstance(item, bool) for item in index)) or
+                (hasattr(index, 'dtype') and index.dtype == 'bool')):
+            # boolean indexing, either with list or np array
+            out = self._subset([i for i, val in enumerate(index) if val])
+        elif (isinstance(index, list) or
+              (hasattr(index, 'dtype') and index.dtype == 'int')):
+            # fancy indexing, either with list or np array
+            out = self._subset([range(len(self))[item] for item in index])
+        elif isinstance(index, int):
+            # an index gets the member at that position
+            out = self._member(range(len(self))[index])
         else:
-            out = super(Bundle, self).__getitem__(index)
+            raise IndexError("Cannot index {} with given values"
+                             "".format(self.__class__.__name__))
+        return out
+
+    def _refresh_locations(self, positions=None):
+        """Update the member table for loaded members that were renamed or
+        moved through their instances.
+
+        :Keywords:
+            *positions*
+                positions in the member table of the members to check; all
+                loaded members are checked if ``None``
+        """
+        with self._lock:
+            if positions is None:
+                members = list(self._cache.items())
+            else:
+                uuids = [self._state['uuid'][i] for i in positions]
+                members = [(uuid, self._cache.get(uuid)) for uuid in uuids]
+
+            for uuid, member in members:
+                position = self._position(uuid)
+                if member is None or position is None:
+                    continue
+
+                abspath = os.path.dirname(member.filepath)
+                if abspath != self._state['abspath'][position]:
+                    self._add_member(uuid,
+                                     self._state['treanttype'][position],
+                                     abspath)
+
+    def _member(self, position):
+        """Get the member at the given position in the member table.
+
+        """
+        uuid = self._state['uuid'][position]
+        treant = self._cache.get(uuid)
+        if not treant:
+            treant = self._load_member(uuid,
+                                       self._state['treanttype'][position],
+                                       self._state['abspath'][position])
+            if treant:
+                self._cache[uuid] = treant
+            else:
+                # member has moved; let the Foxhound track it down
+                treant = self._list()[position]
+
+        return treant
+
+    def _subset(self, positions):
+        """Get a new Bundle of the members at the given positions in the
+        member table, in the given order.
+
+        """
+        out = self.__class__(limbs=self.limbs, workers=self.workers)
+
+        # positions may repeat; members are only kept once
+        seen = set()
+        keys = self._state.keys()
+        positions = [i for i in positions
+                     if not (keys[i] in seen or seen.add(keys[i]))]
+
+        out._state = self._state.take(positions)
+        out._reindex()
+        out._cache.update((uuid, self._cache[uuid])
+                          for uuid in out._state.values('uuid')
+                          if uuid in self._cache)
+
         return out
 
     def __add__(self, other):
@@ -640,14 +1039,17 @@ class Bundle(CollectionMixin):
         from .treants import Treant
 
         if isinstance(other, Bundle):
-            limbs = self.limbs | other.limbs
-            return Bundle(list(set(self) - set(other)), limbs=limbs)
+            keys = other._uuidindex
         elif isinstance(other, Treant):
-            limbs = self.limbs | other.limbs
-            return Bundle(list(set(self) - set([other])), limbs=limbs)
+            keys = {_uuid_key(other.uuid)}
         else:
             raise TypeError("Operands must be Treant-derived or Bundles.")
 
+        out = self._subset([i for i, key in enumerate(self._state.keys())
+                            if key not in keys])
+        out.attach(*other.limbs - out.limbs)
+        return out
+
     def __or__(self, other):
         """Return a Bundle giving the union of Bundles `a` and `b`.
 
@@ -663,8 +1065,11 @@ class Bundle(CollectionMixin):
 
         """
         if isinstance(other, Bundle):
-            limbs = self.limbs | other.limbs
-            return Bundle(list(set(self) & set(other)), limbs=limbs)
+            out = self._subset([i for i, key
+                                in enumerate(self._state.keys())
+                                if key in other._uuidindex])
+            out.attach(*other.limbs - out.limbs)
+            return out
         else:
             raise TypeError("Operands must be Bundles.")
 
@@ -674,8 +1079,7 @@ class Bundle(CollectionMixin):
 
         """
         if isinstance(other, Bundle):
-            limbs = self.limbs | other.limbs
-            return Bundle(list(set(self) ^ set(other)), limbs=limbs)
+            return (self - other) + (other - self)
         else:
             raise TypeError("Operands must be Bundles.")
 
@@ -752,6 +1156,8 @@ class Bundle(CollectionMixin):
         """
         from .treants import Treant
 
+        # members are recorded from their state file names where possible;
+        # Treant instances are only created when members are accessed
         outconts = list()
         for treant in treants:
             if treant is None:
@@ -759,29 +1165,48 @@ class Bundle(CollectionMixin):
             elif isinstance(treant, (list, tuple, View)):
                 self.add(*treant)
             elif isinstance(treant, Bundle):
-                self.add(*treant.filepaths)
+                members = treant._get_members()
+                self._add_members(*[members[field]
+                                    for field in self._fields])
                 self._cache.update(treant._cache)
             elif isinstance(treant, Treant):
-                outconts.append(treant)
+                outconts.append((treant.uuid, treant.treanttype,
+                                 treant.abspath))
                 self._cache[treant.uuid] = treant
             elif isinstance(treant, (Leaf, Tree)):
-                tre = findTreants.path2treant(treant.abspath)
-                outconts.extend(tre)
+                outconts.extend(self._records(treant.abspath))
             elif os.path.exists(treant):
-                tre = findTreants.path2treant(treant)
-                outconts.extend(tre)
+                outconts.extend(self._records(treant))
             elif isinstance(treant, string_types):
-                tre = findTreants.path2treant(*glob.glob(treant))
-                outconts.extend(tre)
+                outconts.extend(self._records(*glob.glob(treant)))
             else:
                 raise TypeError("'{}' not a valid input "
                                 "for Bundle".format(treant))
 
-        attrs = []
-        for attr in ('uuid', 'treanttype', 'abspath'):
-            attrs.append([getattr(treant, attr) for treant in outconts])
+        if outconts:
+            self._add_members(*zip(*outconts))
 
-        self._add_members(*attrs)
+    def _records(self, *paths):
+        """Get (uuid, treanttype, abspath) for the Treants at the given paths.
+
+        Paths that give a state file of an unknown treant type are loaded as
+        Treants, which are cached.
+
+        """
+        out = list()
+        for path in paths:
+            records = findTreants.path2record(path)
+            if records or os.path.isdir(path):
+                out.extend((record.uuid, record.treanttype,
+                            os.path.dirname(record.filepath))
+                           for record in records)
+            else:
+                for treant in findTreants.path2treant(path):
+                    self._cache[treant.uuid] = treant
+                    out.append((treant.uuid, treant.treanttype,
+                                treant.abspath))
+
+        return out
 
     def remove(self, *members):
         """Remove any number of members from the collection.
@@ -809,11 +1234,12 @@ class Bundle(CollectionMixin):
             else:
                 raise TypeError('Only an integer or treant acceptable')
 
-        self._del_members(remove)
+        with self._lock:
+            self._del_members(remove)
 
-        # remove from cache
-        for uuid in remove:
-            self._cache.pop(uuid, None)
+            # remove from cache
+            for uuid in remove:
+                self._cache.pop(uuid, None)
 
     def clear(self):
         """Remove all members.
@@ -918,7 +1344,8 @@ class Bundle(CollectionMixin):
         paths = {path: members[path] for path in self._memberpaths}
 
         foxhound = findTreants.Foxhound(self, members['uuid'], paths,
-                                        timeout=self.searchtime)
+                                        timeout=self.searchtime,
+                                        workers=self._workers())
         found = foxhound.fetch(as_treants=False)
 
         if None not in found.values():
@@ -940,25 +1367,36 @@ class Bundle(CollectionMixin):
         not intended for user-level use.
 
         """
-        members = self._get_members()
+        members = self._state
         uuids = members['uuid']
 
-        findlist = list()
+        # positions of members to find, with uuids as keys
+        findlist = dict()
         memberlist = list()
 
-        for uuid in uuids:
-            if uuid in self._cache and self._cache[uuid]:
-                memberlist.append(self._cache[uuid])
+        for position, (uuid, treanttype, abspath) in enumerate(
+                zip(uuids, members['treanttype'], members['abspath'])):
+            member = self._cache.get(uuid)
+
+            # instantiate members not yet accessed from their recorded paths
+            if not member:
+                member = self._load_member(uuid, treanttype, abspath)
+                if member:
+                    self._cache[uuid] = member
+
+            if member:
+                memberlist.append(member)
             else:
                 memberlist.append(None)
-                findlist.append(uuid)
+                findlist[uuid] = position
 
         # track down our non-cached treants
         if findlist:
-            paths = {path: members[path]
+            paths = {path: list(members[path])
                      for path in self._memberpaths}
-            foxhound = findTreants.Foxhound(self, findlist, paths,
-                                            timeout=self.searchtime)
+            foxhound = findTreants.Foxhound(self, list(findlist), paths,
+                                            timeout=self.searchtime,
+                                            workers=self._workers())
             foundconts = foxhound.fetch(as_treants=True)
 
             # add to cache, and ensure we get updated paths with a re-add in
@@ -971,65 +1409,131 @@ class Bundle(CollectionMixin):
                 pass
 
             # insert found treants into output list
-            for uuid in findlist:
+            for uuid, position in findlist.items():
                 result = foundconts[uuid]
                 if not result:
-                    ind = list(members['uuid']).index(uuid)
                     raise IOError("Could not find member {} (uuid: {});"
-                                  " re-add or remove it.".format(ind, uuid))
+                                  " re-add or remove it.".format(position,
+                                                                 uuid))
 
-                memberlist[list(uuids).index(uuid)] = result
+                memberlist[position] = result
 
         return memberlist
 
-    def map(self, function, processes=1, **kwargs):
-        """Apply a function to each member, perhaps in parallel.
+    @staticmethod
+    def _load_member(uuid, treanttype, abspath):
+        """Instantiate a member from its recorded location.
+
+        :Returns:
+            *treant*
+                the member; ``None`` if its state file isn't at the recorded
+                location
+        """
+        from . import _TREANTS
 
-        A pool of processes is created for *processes* > 1; for example,
-        with 40 members and 'processes=4', 4 processes will be created,
-        each working on a single member at any given time. When each process
-        completes work on a member, it grabs another, until no members remain.
+        treantclass = _TREANTS.get(treanttype, _TREANTS['Treant'])
 
-        *kwargs* are passed to the given function when applied to each member
+        exts = [treantclass._backendclass._ext]
+        exts.extend(ext for ext in findTreants.statefile_exts()
+                    if ext != exts[0])
 
-        :Arguments:
-            *function*
-                function to apply to each member; must take only a single
-                treant instance as input, but may take any number of keyword
-                arguments
+        for ext in exts:
+            statefile = os.path.join(
+                    abspath, findTreants.statefilename(treanttype, uuid, ext))
+            if os.path.exists(statefile):
+                return treantclass(statefile)
+
+        return None
+
+    def _descriptors(self, members, processes=1, executor=None, **options):
+        """Get members as sent to other processes or threads for mapping.
+
+        Members are sent as lightweight descriptors of their class and state
+        file, and rebuilt without searching for or initializing their state
+        files.
+
+        """
+        if executor is not None or processes > 1:
+            members = [_MemberDescriptor(type(member), member.filepath)
+                       for member in members]
+
+        return members
+
+    def watch(self, interval=1.0, inotify=None):
+        """Keep the member table current as members move or change on disk.
+
+        Members are watched from a background thread until the returned
+        :class:`~datreant.core.watch.Watcher` is stopped. Members that move
+        are found as they do, so accessing them doesn't require a search, and
+        cached state of members is invalidated when their state files change.
+
+        Example::
+
+            with b.watch():
+                serve_dashboard(b)
 
         :Keywords:
-            *processes*
-                how many processes to use; if 1, applies function to each
-                member in member order
+            *interval*
+                seconds between checks when polling, or between updates of
+                which directories are watched when using inotify
+            *inotify*
+                whether to use inotify; if ``None``, inotify is used if
+                available, falling back to polling
 
         :Returns:
-            *results*
-                list giving the result of the function for each member,
-                in member order; if the function returns ``None`` for each
-                member, then only ``None`` is returned instead of a list
-            """
-        if processes > 1:
-            pool = mp.Pool(processes=processes)
-            results = dict()
-            results = {member.uuid: pool.apply_async(
-                    function, args=(member,), kwds=kwargs) for member in self}
-
-            output = {key: results[key].get() for key in results}
-
-            pool.close()
-            pool.join()
-
-            # sort by member order
-            results = [output[uuid] for uuid in self.uuids]
-        else:
-            results = [function(member, **kwargs) for member in self]
+            *watcher*
+                the started Watcher
+        """
+        from .watch import Watcher
 
-        # check if list is all ``None``: if so, we return ``None``
-        if all([(i is None) for i in results]):
-            results = None
+        return Watcher(self, interval=interval, inotify=inotify).start()
+
+    @contextmanager
+    def transaction(self):
+        """Context manager for making many changes to all members at once.
+
+        Each member's state file is read once on entry, and changes made
+        within the block are held in memory. On exit, the state files of
+        members that changed are written one at a time in order of member
+        uuid: each is locked, read again, has the changes applied, and is
+        written. No locks or file descriptors are held for the duration of
+        the block, so Bundles of any size can be used, and changes made to
+        members by other processes in the meantime are kept unless they
+        change the same values.
 
-        return results
+        If an exception is raised within the block, no changes are written
+        to any member.
+
+        Example::
+
+            with b.transaction():
+                b.tags.add('hot', 'dry')
+                b.categories['temperature'] = 350
+
+        """
+        members = sorted(self._list(), key=lambda member: member.uuid)
+
+        # members already buffering changes, such as in an enclosing
+        # transaction, are left to it
+        buffered = list()
+        try:
+            for member in members:
+                with member._read:
+                    if member._backend._buffer():
+                        buffered.append(member)
+            yield self
+        except BaseException:
+            for member in buffered:
+                member._backend._unbuffer()
+            raise
+
+        changes = [(member,) + member._backend._unbuffer()
+                   for member in buffered]
+        for member, base, state in changes:
+            if state != base:
+                with member._write:
+                    member._backend._state = merge_state(
+                            base, state, member._backend._state)
 
     @property
     def searchtime(self):
@@ -1063,6 +1567,124 @@ class Bundle(CollectionMixin):
         return Bundle([self[name] for name in
                       fnmatch.filter(self.names, pattern)], limbs=self.limbs)
 
+    def _workers(self, workers=None):
+        """Get the number of threads to use for reading member state files.
+
+        """
+        if workers is not None:
+            return workers
+        elif self.workers is not None:
+            return self.workers
+        else:
+            return WORKERS
+
+    def _read_members(self, function, workers=None, members=None):
+        """Apply `function` to each member, perhaps with a pool of threads.
+
+        Used for reading from the state file of each member; state files are
+        read concurrently for more than one worker, unless any are locked
+        already. If `members` is given, only these Treants are read from
+        instead.
+
+        Returns
+        -------
+        list
+            Result of `function` for each member, in member order.
+
+        """
+        if members is None:
+            members = self._list()
+
+        # members already locked, such as in a transaction, can only be read
+        # by the thread holding the lock
+        workers = self._workers(workers)
+        if (workers > 1 and len(members) > 1 and
+                not any(member._backend.fdlock for member in members)):
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(function, members))
+        else:
+            return [function(member) for member in members]
+
+    def amap(self, function, workers=None, **kwargs):
+        """Apply a function to each member in a pool of threads, without
+        blocking the event loop.
+
+        This is the asynchronous counterpart of :meth:`map` for use with
+        :mod:`asyncio`; use as ``results = await b.amap(function)``. At most
+        `workers` members are worked on at once.
+
+        `kwargs` are passed to the given function when applied to each member
+
+        Parameters
+        ----------
+        function : function
+            Function to apply to each member. Must take only a single Treant
+            instance as input, but may take any number of keyword arguments.
+        workers : int
+            Number of threads to use; defaults to the Bundle's setting.
+
+        Returns
+        -------
+        Future
+            Awaitable giving the list of results of the function for each
+            member, in member order.
+
+        """
+        def apply(member):
+            return function(member, **kwargs)
+
+        return self._run_async(self._read_members, apply, workers=workers)
+
+    def _run_async(self, function, *args, **kwargs):
+        """Run a function reading the state of members without blocking the
+        event loop.
+
+        Other threads can't read the state file of a member while the calling
+        thread holds a lock on it, such as within ``Treant.transaction``; the
+        function is then run right away instead, and a completed future is
+        returned.
+
+        """
+        if any(member._backend._held()
+               for member in list(self._cache.values())):
+            return run_inline(function, *args, **kwargs)
+
+        return run_async(function, *args, **kwargs)
+
+    def query(self, expr, workers=None):
+        """Return a Bundle of members matching a query expression on their
+        tags and categories.
+
+        Expressions use Python syntax; bare names refer to categories, and
+        ``tags`` to the set of each member's tags::
+
+            >>> b.query("temp > 300 and solvent == 'water'")
+            >>> b.query("'ghost' in tags or categories['speed limit'] < 5")
+
+        The state file of each member is read only once. See
+        :mod:`datreant.core.query` for details.
+
+        Parameters
+        ----------
+        expr : str or Query
+            Query expression to evaluate.
+        workers : int
+            Number of threads to use for reading state files; defaults to
+            the Bundle's setting.
+
+        Returns
+        -------
+        Bundle
+            Bundle of matching members, in member order.
+
+        """
+        from .query import Query
+
+        if not isinstance(expr, Query):
+            expr = Query(expr)
+
+        return self[expr.mask(self, workers=workers)]
+
     def _add_members(self, uuids, treanttypes, abspaths):
         """Add many members at once.
 
@@ -1078,8 +1700,10 @@ class Bundle(CollectionMixin):
                 list of abspaths
 
         """
-        for uuid, treanttype, abspath in zip(uuids, treanttypes, abspaths):
-            self._add_member(uuid, treanttype, abspath)
+        with self._lock:
+            for uuid, treanttype, abspath in zip(uuids, treanttypes,
+                                                 abspaths):
+                self._add_member(uuid, treanttype, abspath)
 
     def _add_member(self, uuid, treanttype, abspath):
         """Add a member to the Bundle.
@@ -1096,17 +1720,81 @@ class Bundle(CollectionMixin):
                 absolute path to directory of new member in the filesystem
 
         """
-        member_rec = {'uuid': uuid,
-                      'treanttype': treanttype,
-                      'abspath': os.path.abspath(abspath)}
+        key = _uuid_key(uuid)
+        if key is None:
+            raise ValueError("'{}' is not a valid uuid".format(uuid))
 
-        # check if uuid already present
-        uuids = [member['uuid'] for member in self._state]
+        abspath = os.path.abspath(abspath)
 
-        if uuid in uuids:
-            self._state[uuids.index(uuid)] = member_rec
-        else:
-            self._state.append(member_rec)
+        with self._lock:
+            # check if uuid already present
+            position = self._uuidindex.get(key)
+
+            if position is None:
+                position = len(self)
+                self._state.append(key, treanttype, abspath)
+                self._uuidindex[key] = position
+                self._index_name(self._state.name(position), position)
+            else:
+                oldname = self._state.name(position)
+                self._state.update(position, treanttype, abspath)
+                name = self._state.name(position)
+                if oldname != name:
+                    self._unindex_name(oldname, position)
+                    self._index_name(name, position)
+
+    def _reindex(self):
+        """Rebuild the uuid and name indexes of the member table.
+
+        """
+        self._uuidindex = dict()
+        self._nameindex = dict()
+        for position, (key, name) in enumerate(
+                zip(self._state.keys(), self._state.names())):
+            self._uuidindex[key] = position
+            self._index_name(name, position)
+
+    def _named(self, name):
+        """Get the positions of members with the given name.
+
+        :Returns:
+            *positions*
+                sorted list of positions in the member table
+        """
+        positions = self._nameindex.get(name)
+        if positions is None:
+            return []
+        elif isinstance(positions, list):
+            return list(positions)
+        return [positions]
+
+    def _index_name(self, name, position):
+        positions = self._nameindex.get(name)
+        if positions is None:
+            self._nameindex[name] = position
+            return
+        elif not isinstance(positions, list):
+            positions = self._nameindex[name] = [positions]
+        bisect.insort(positions, position)
+
+    def _unindex_name(self, name, position):
+        positions = self._nameindex[name]
+        if not isinstance(positions, list):
+            del self._nameindex[name]
+            return
+
+        positions.remove(position)
+        if len(positions) == 1:
+            self._nameindex[name] = positions[0]
+
+    def _position(self, uuid):
+        """Get the position of a member in the member table by uuid.
+
+        :Returns:
+            *position*
+                position of the member; ``None`` if not a member
+        """
+        return self._uuidindex.get(_uuid_key(uuid))
 
     def _del_members(self, uuids=None, all=False):
         """Remove members from the Bundle.
@@ -1118,26 +1806,18 @@ class Bundle(CollectionMixin):
                 When True, remove all members [``False``]
 
         """
-        if all:
-            self._state = list()
-        else:
-            # remove redundant uuids from given list if present
-            uuids = set([str(uuid) for uuid in uuids])
-
-            # get matching rows
-            memberlist = list()
-            for i, member in enumerate(self._state):
-                for uuid in uuids:
-                    if (member['uuid'] == uuid):
-                        memberlist.append(i)
-
-            memberlist.sort()
-            j = 0
-            # delete matching entries; have to use j to shift the register as
-            # we remove entries
-            for i in memberlist:
-                self._state.pop(i - j)
-                j = j + 1
+        with self._lock:
+            if all:
+                self._state = _MemberTable()
+            else:
+                # remove redundant uuids from given list if present
+                keys = set(_uuid_key(str(uuid)) for uuid in uuids)
+
+                keep = [i for i, key in enumerate(self._state.keys())
+                        if key not in keys]
+                self._state = self._state.take(keep)
+
+            self._reindex()
 
     def _get_member(self, uuid):
         """Get all stored information on the specified member.
@@ -1154,12 +1834,12 @@ class Bundle(CollectionMixin):
                 a dictionary containing all information stored for the
                 specified member
         """
-        memberinfo = None
-        for member in self._state:
-            if member['uuid'] == uuid:
-                memberinfo = member
+        position = self._position(uuid)
+        if position is None:
+            return None
 
-        return memberinfo
+        return {field: self._state[field][position]
+                for field in self._fields}
 
     def _get_members(self):
         """Get full member table.
@@ -1172,31 +1852,25 @@ class Bundle(CollectionMixin):
                 dict giving full member data, with fields as keys and in member
                 order
         """
-        out = defaultdict(list)
-
-        for member in self._state:
-            for key in self._fields:
-                out[key].append(member[key])
-
-        return out
+        return {field: list(self._state[field]) for field in self._fields}
 
     def _get_members_uuid(self):
         """List uuid for each member.
 
         :Returns:
             *uuids*
-                list giving treanttype of each member, in order
+                list giving uuid of each member, in order
         """
-        return [member['uuid'] for member in self._state]
+        return list(self._state['uuid'])
 
     def _get_members_names(self):
-        """List uuid for each member.
+        """List name for each member.
 
         :Returns:
-            *uuids*
-                list giving treanttype of each member, in order
+            *names*
+                list giving name of each member, in order
         """
-        return [os.path.basename(member['abspath']) for member in self._state]
+        return self._state.names()
 
     def _get_members_treanttype(self):
         """List treanttype for each member.
@@ -1205,7 +1879,206 @@ class Bundle(CollectionMixin):
             *treanttypes*
                 list giving treanttype of each member, in order
         """
-        return [member['treanttype'] for member in self._state]
+        return list(self._state['treanttype'])
+
+
+class _MemberDescriptor(namedtuple('_MemberDescriptor',
+                                   ['treantclass', 'statefile'])):
+    """Lightweight stand-in for a Treant sent to other processes.
+
+    """
+    __slots__ = ()
+
+    def rebuild(self):
+        return self.treantclass.from_statefile(self.statefile)
+
+
+class MapFailure(namedtuple('MapFailure',
+                            ['member', 'exception', 'traceback'])):
+    """Failure of a function applied to a member with ``on_error='collect'``.
+
+    Attributes
+    ----------
+    member : Treant, Tree, or Leaf
+        Member the function failed for.
+    exception : Exception
+        Exception raised by the function, or the ``TimeoutError`` or
+        ``BrokenProcessPool`` error for a member whose worker hung or died.
+    traceback : str
+        Formatted traceback of the exception, if raised by the function.
+
+    """
+    __slots__ = ()
+
+
+def _failure(exception, tb=None):
+    # exceptions must be sent back from other processes
+    try:
+        pickle.loads(pickle.dumps(exception))
+    except Exception:
+        exception = RuntimeError(repr(exception))
+
+    return MapFailure(None, exception, tb)
+
+
+def _apply_chunk(function, members, kwargs, collect=False, retries=0):
+    """Apply a function to each of a chunk of members.
+
+    Members given as descriptors are rebuilt first. The function is tried
+    again up to `retries` times for a member if it raises an exception; if it
+    fails each time, the exception is raised, or if `collect` is ``True``, a
+    :class:`MapFailure` is given in place of the result.
+
+    """
+    results = list()
+    for member in members:
+        for attempt in range(retries + 1):
+            try:
+                if isinstance(member, _MemberDescriptor):
+                    member = member.rebuild()
+                results.append(function(member, **kwargs))
+                break
+            except Exception as e:
+                if attempt < retries:
+                    continue
+                elif not collect:
+                    raise
+                results.append(_failure(e, traceback.format_exc()))
+
+    return results
+
+
+def _imap(function, members, kwargs, processes=1, executor=None,
+          chunksize=None, ordered=True, on_error='raise', retries=0,
+          timeout=None):
+    """Apply a function to each member, yielding member positions and results
+    as they are done.
+
+    Results are yielded in member order if `ordered` is ``True``, and in the
+    order chunks are finished otherwise. Only a few chunks per worker are
+    given to the executor at a time, so that results aren't all held in
+    memory at once.
+
+    A chunk not finished within `timeout` seconds per member is given up on,
+    as is a chunk whose worker process dies; the processes of a pool created
+    here are then killed and replaced. Such chunks are sent again up to
+    `retries` times.
+
+    """
+    if on_error not in ('raise', 'collect'):
+        raise ValueError("on_error must be either 'raise' or 'collect'")
+    collect = on_error == 'collect'
+
+    if executor is None and processes <= 1:
+        if timeout is not None:
+            raise ValueError("A timeout requires processes > 1 or an "
+                             "executor")
+        for position, member in enumerate(members):
+            yield position, _apply_chunk(function, [member], kwargs,
+                                         collect, retries)[0]
+        return
+
+    owned = executor is None
+    if owned:
+        executor = ProcessPoolExecutor(max_workers=processes)
+    workers = getattr(executor, '_max_workers', processes)
+
+    if chunksize is None and timeout is not None:
+        # timeouts can only be attributed to whole chunks
+        chunksize = 1
+    elif chunksize is None:
+        chunksize = max(1, -(-len(members) // (4 * workers)))
+
+    # with a timeout, a chunk must start as soon as it is given out for its
+    # deadline to be fair
+    window = workers if timeout is not None else 2 * workers
+
+    starts = iter(range(0, len(members), chunksize))
+    pending = deque()
+
+    def submit(chunk):
+        start, attempt = chunk[:2]
+        future = executor.submit(_apply_chunk, function,
+                                 members[start:start + chunksize], kwargs,
+                                 collect, retries)
+        deadline = None
+        if timeout is not None:
+            deadline = (time.time() +
+                        timeout * len(members[start:start + chunksize]))
+        return [start, attempt, future, deadline]
+
+    def fill():
+        for start in itertools.islice(starts, window - len(pending)):
+            pending.append(submit([start, 0]))
+
+    try:
+        fill()
+        while pending:
+            candidates = [pending[0]] if ordered else list(pending)
+            deadlines = [chunk[3] for chunk in candidates
+                         if chunk[3] is not None]
+            wait_for = (max(0, min(deadlines) - time.time())
+                        if deadlines else None)
+            done, _ = wait([chunk[2] for chunk in candidates],
+                           timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            if done:
+                chunk = next(chunk for chunk in candidates
+                             if chunk[2] in done)
+                error = chunk[2].exception()
+            else:
+                chunk = min(candidates, key=lambda chunk: chunk[3])
+                error = TimeoutError("Member not done within {} "
+                                     "seconds".format(timeout))
+
+            start, attempt, future = chunk[:3]
+            size = len(members[start:start + chunksize])
+
+            if error is None:
+                pending.remove(chunk)
+                results = future.result()
+            else:
+                hung = isinstance(error, (TimeoutError, BrokenProcessPool))
+                if owned and hung:
+                    # workers are stuck or dead; start over with a new pool,
+                    # giving out again any chunks that weren't finished
+                    _kill(executor)
+                    executor = ProcessPoolExecutor(max_workers=processes)
+                    for other in pending:
+                        if other is not chunk and not (
+                                other[2].done() and
+                                other[2].exception() is None):
+                            other[:] = submit(other)
+
+                if hung and attempt < retries:
+                    chunk[:] = submit([start, attempt + 1])
+                    continue
+
+                pending.remove(chunk)
+                if not collect:
+                    raise error
+                results = [MapFailure(None, error, None)] * size
+
+            fill()
+            for position, result in enumerate(results, start):
+                yield position, result
+    finally:
+        if owned:
+            if pending:
+                _kill(executor)
+            else:
+                executor.shutdown()
+
+
+def _kill(executor):
+    """Kill the worker processes of a process pool, and shut it down.
+
+    """
+    for process in list((getattr(executor, '_processes', None) or
+                         {}).values()):
+        process.terminate()
+
+    executor.shutdown(wait=False)
 
 
 class _Loc(object):
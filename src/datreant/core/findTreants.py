@@ -4,14 +4,105 @@ Functions and classes for finding Treants in the filesystem.
 """
 import glob
 import os
+import re
 import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 
-def statefilename(treanttype, uuid):
+# lightweight record of a Treant, obtained from its state file name alone
+TreantRecord = namedtuple('TreantRecord', ['uuid', 'treanttype', 'filepath'])
+
+
+def statefilename(treanttype, uuid, ext=None):
     """Return state file name given the type of treant and its uuid.
 
+    If `ext` is ``None``, the extension used is that of the state file
+    format for the given treant type.
+
+    """
+    if ext is None:
+        from . import _TREANTS
+        ext = _TREANTS[treanttype]._backendclass._ext
+
+    return "{}.{}.{}".format(treanttype, uuid, ext)
+
+
+def statefile_exts():
+    """Return the file extensions of all known state file formats.
+
+    """
+    from . import _TREANTS
+    from .backends.statefiles import _STATEFILES
+
+    exts = set(_STATEFILES)
+    exts.update(treant._backendclass._ext for treant in _TREANTS.values())
+    return exts
+
+
+def statefile_regex():
+    """Return a compiled regular expression matching state file names.
+
+    The expression matches the name of a state file for any known treant
+    type and format, and captures the treant type, uuid, and extension.
+
+    """
+    global _statefile_regex
+    from . import _TREANTS
+
+    key = (tuple(_TREANTS), tuple(sorted(statefile_exts())))
+    if _statefile_regex is None or _statefile_regex[0] != key:
+        pattern = r"^({})\.([^.]+)\.({})$".format(
+                "|".join(re.escape(x) for x in key[0]),
+                "|".join(re.escape(x) for x in key[1]))
+        _statefile_regex = (key, re.compile(pattern))
+
+    return _statefile_regex[1]
+
+
+_statefile_regex = None
+
+
+def parse_statefilename(filename):
+    """Get treant type, uuid, and extension from a state file name.
+
+    :Arguments:
+        *filename*
+            name of or path to state file
+
+    :Returns:
+        *parsed*
+            tuple giving the treant type, uuid, and extension of the state
+            file; ``None`` if `filename` isn't the name of a state file for a
+            known treant type and format
     """
-    return "{}.{}.{}".format(treanttype, uuid, 'json')
+    match = statefile_regex().match(os.path.basename(filename))
+    if match:
+        return match.groups()
+    else:
+        return None
+
+
+def statefile2record(filename):
+    """Return a :class:`TreantRecord` for the given state file.
+
+    The state file isn't opened; all information is obtained from its name.
+
+    :Arguments:
+        *filename*
+            path to state file
+
+    :Returns:
+        *record*
+            record of the Treant; ``None`` if `filename` isn't the name of a
+            state file for a known treant type and format
+    """
+    parsed = parse_statefilename(filename)
+    if parsed is None:
+        return None
+
+    treanttype, uuid, ext = parsed
+    return TreantRecord(uuid, treanttype, os.path.abspath(filename))
 
 
 def glob_treant(treant):
@@ -29,19 +120,43 @@ def glob_treant(treant):
             list giving absolute paths of state files found
             in directory
     """
-    from . import _TREANTS
-
-    fileglob = list()
-    for treanttype in _TREANTS:
-        fileglob.extend(
-            glob.glob(os.path.join(
-                treant,
-                '{}.*.{}'.format(treanttype, 'json'))))
+    fileglob = [x for x in glob.glob(os.path.join(treant, '*.*.*'))
+                if parse_statefilename(x)]
 
     paths = [os.path.abspath(x) for x in fileglob]
     return paths
 
 
+def path2record(*paths):
+    """Return records of Treants from directories or full paths containing
+    Treant state files, without opening any state file.
+
+    Parameters
+    ----------
+    paths : list
+        List of directories containing state files or full paths to state
+        files.
+
+    Returns
+    -------
+    records : list
+        List of :class:`TreantRecord` for the Treants found; paths to files
+        that aren't state files of a known treant type and format are skipped.
+
+    """
+    records = list()
+    for path in paths:
+        if os.path.isdir(path):
+            records.extend(statefile2record(item)
+                           for item in glob_treant(path))
+        else:
+            record = statefile2record(path)
+            if record is not None and os.path.exists(path):
+                records.append(record)
+
+    return records
+
+
 def path2treant(*paths):
     """Return Treants from directories or full paths containing Treant
         state files.
@@ -54,7 +169,8 @@ def path2treant(*paths):
     paths : list
         List of directories containing state files or full paths to state files
         to load Treants from; if ``None`` is an element, then ``None`` returned
-        in output list.
+        in output list. State files that no longer exist are loaded from their
+        recorded location in :mod:`~datreant.core.locations`, if any.
 
     Returns
     -------
@@ -63,9 +179,15 @@ def path2treant(*paths):
         indicates that ``None`` was present in the list of paths.
 
     """
-    from . import _TREANTS
+    from . import _TREANTS, locations
     treants = list()
     for path in paths:
+        # a state file that has moved may have a recorded location
+        if path is not None and not os.path.exists(path):
+            parsed = parse_statefilename(path)
+            if parsed:
+                path = locations.lookup(parsed[1]).get(parsed[1], path)
+
         if path is None:
             treants.append(None)
         elif os.path.isdir(path):
@@ -98,7 +220,7 @@ class Foxhound(object):
     TreantFiles use this class to find their file on disk when it moves.
 
     """
-    def __init__(self, caller, uuids, paths, timeout=10):
+    def __init__(self, caller, uuids, paths, timeout=10, workers=1):
         """Generate a Foxhound to track down Treants.
 
         :Arguments:
@@ -114,7 +236,10 @@ class Foxhound(object):
 
         :Keywords:
             *timeout*
-                maximum time, in seconds, the Foxhound will spend fetching.
+                maximum time, in seconds, the Foxhound will spend fetching;
+                ``None`` indicates no limit
+            *workers*
+                number of threads to use for scanning directories
 
         """
         self.caller = caller
@@ -122,6 +247,7 @@ class Foxhound(object):
         self.paths = paths
 
         self.timeout = timeout
+        self.workers = workers
 
         # once found: uuids as keys, absolute paths as values
         self.treants = dict()
@@ -142,8 +268,22 @@ class Foxhound(object):
                 instead of paths for *as_treants* == True.
 
         """
+        from . import locations
+        from .treants import Treant
+
+        # recorded locations are checked before any search
+        results = dict.fromkeys(self.uuids)
+        results.update(locations.lookup(*self.uuids))
+        uuids = [uuid for uuid in self.uuids if not results[uuid]]
 
-        results = self._find_bundle_members()
+        if uuids:
+            if isinstance(self.caller, Treant):
+                found = self._find_treantfile(uuids)
+            else:
+                found = self._find_bundle_members(uuids)
+
+            results.update(found)
+            locations.record(*[path for path in found.values() if path])
 
         if as_treants:
             conts = path2treant(*results.values())
@@ -151,55 +291,73 @@ class Foxhound(object):
 
         return results
 
-    def _check_paths(self):
+    def _check_paths(self, uuids=None):
         """Check last-known locations for Treants.
 
+        :Keywords:
+            *uuids*
+                uuids of Treants to check for; defaults to all
+
         :Returns:
             *results*
                 dictionary giving Treant uuids as keys and absolute paths to
                 their state files as values; ``None`` as a value indicates
                 that no state file could be found.
         """
+        if uuids is None:
+            uuids = self.uuids
+
         # initialize output dictionary with None
-        outpaths = dict.fromkeys(self.uuids)
-        uuids = list(self.uuids)
-
-        if 'abspath' in self.paths:
-            for path in self.paths['abspath']:
-                found = []
-                candidates = glob.glob(
-                        os.path.join(path, '*.*.json'))
-
-                for candidate in candidates:
-                    for uuid in uuids:
-                        if uuid in candidate:
-                            outpaths[uuid] = os.path.abspath(candidate)
-                            found.append(uuid)
-                            break
-
-                for item in found:
-                    uuids.remove(item)
-
-        if 'relpath' in self.paths and uuids:
-            # get uuids for which paths haven't been found
-            for path in self.paths['relpath']:
-                found = []
-                candidates = glob.glob(
-                        os.path.join(path, '*.*.json'))
-
-                for candidate in candidates:
-                    for uuid in uuids:
-                        if uuid in candidate:
-                            outpaths[uuid] = os.path.abspath(candidate)
-                            found.append(uuid)
-                            break
-
-                for item in found:
-                    uuids.remove(item)
+        outpaths = dict.fromkeys(uuids)
+        missing = set(uuids)
+
+        searched = set()
+        for key in ('abspath', 'relpath'):
+            for path in self.paths.get(key, ()):
+                if not missing:
+                    break
+
+                # members often share directories; glob each only once
+                path = os.path.abspath(path)
+                if path in searched:
+                    continue
+                searched.add(path)
+
+                for uuid, candidate in self._statefiles(
+                        glob_treant(path)).items():
+                    if uuid in missing:
+                        outpaths[uuid] = candidate
+                        missing.remove(uuid)
 
         return outpaths
 
-    def _find_treantfile(self):
+    @staticmethod
+    def _statefiles(filenames, root=None):
+        """Get the state files among the given file names, keyed by uuid.
+
+        :Arguments:
+            *filenames*
+                names of or paths to files
+            *root*
+                directory the file names are relative to; if ``None``, paths
+                are made absolute from the current directory
+
+        :Returns:
+            *statefiles*
+                dictionary giving uuids as keys and absolute paths to their
+                state files as values
+        """
+        statefiles = dict()
+        for filename in filenames:
+            parsed = parse_statefilename(filename)
+            if parsed:
+                if root is not None:
+                    filename = os.path.join(root, filename)
+                statefiles[parsed[1]] = os.path.abspath(filename)
+
+        return statefiles
+
+    def _find_treantfile(self, uuids=None):
         """Find Treant for a TreantFile.
 
         If a Treant's state file is moved by another process while a
@@ -210,10 +368,34 @@ class Foxhound(object):
         directory. This process continues until either the state file is found,
         the filesystem is exhaustively searched, or the Foxhound times out.
 
+        :Keywords:
+            *uuids*
+                uuids of Treants to find; defaults to all
+
+        :Returns:
+            *outpaths*
+                dictionary giving the Treant's uuid as key and the absolute
+                path to its state file as value; ``None`` as the value
+                indicates that no state file could be found.
+
         """
-        pass
+        outpaths = self._check_paths(uuids)
+        uuids = set(uuid for uuid in outpaths if not outpaths[uuid])
+
+        # previous location may be gone; search then starts from its parent
+        start = None
+        for key in ('abspath', 'relpath'):
+            if self.paths.get(key):
+                start = self.paths[key][0]
+                break
+        if start is None:
+            start = os.curdir
+
+        self._search(os.path.abspath(start), uuids, outpaths)
 
-    def _find_bundle_members(self):
+        return outpaths
+
+    def _find_bundle_members(self, uuids=None):
         """Find Treants that are members of a Bundle.
 
         For finding Bundle members, the Foxhound begins by looking for
@@ -223,6 +405,10 @@ class Foxhound(object):
         directory. This process continues until either all members are found,
         the filesystem is exhaustively searched, or the Foxhound times out.
 
+        :Keywords:
+            *uuids*
+                uuids of Treants to find; defaults to all
+
         :Returns:
             *outpaths*
                 dictionary giving Treant uuids as keys and absolute paths to
@@ -231,49 +417,101 @@ class Foxhound(object):
 
         """
         # search last-known locations
-        outpaths = self._check_paths()
+        outpaths = self._check_paths(uuids)
+        uuids = set(uuid for uuid in outpaths if not outpaths[uuid])
 
-        # get current time
-        currtime = time.time()
+        self._search(os.path.abspath(os.curdir), uuids, outpaths)
 
-        # walk downwards on an upward trajectory through filesystem from the
-        # current working directory
-        uuids = [str(x) for x in outpaths if not outpaths[x]]
-        path = os.path.abspath(os.curdir)
-        prev = None
-        while prev != path and uuids:
-
-            # if search runs over timeout, call it off
-            if ((time.time() - currtime) > self.timeout and
-                    self.timeout is not None):
-                self.caller._logger.info("Search for missing members timed" +
-                                         " out at {}".format(self.timeout) +
-                                         " seconds.")
-                break
+        # TODO: post-check? Since Bundles know the treanttypes of their
+        # members, should we compare these to what is in outpaths?
+
+        return outpaths
+
+    def _search(self, path, uuids, outpaths):
+        """Search downward from a directory, then from each of its parents in
+        turn, for the state files of the given uuids.
 
-            top = True
-            for root, dirs, files in scandir.walk(path):
-                found = []
-                # no need to visit already-visited tree
-                if top and prev:
-                    dirs.remove(os.path.basename(prev))
-                    top = False
+        Subtrees already searched aren't searched again. The search stops as
+        soon as all uuids are found, the root of the filesystem has been
+        searched, or the Foxhound times out.
 
-                for uuid in uuids:
-                    candidate = [os.path.join(root, x)
-                                 for x in files if (uuid in x and x[0] != '.')]
+        :Arguments:
+            *path*
+                absolute path to directory to start from
+            *uuids*
+                set of uuids to find; found uuids are removed
+            *outpaths*
+                dictionary to add found state files to, with uuids as keys
+        """
+        deadline = None
+        if self.timeout is not None:
+            deadline = time.time() + self.timeout
 
-                    if candidate:
-                        outpaths[uuid] = os.path.abspath(candidate[0])
-                        found.append(uuid)
+        prev = None
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            while uuids:
+                if not self._walk(path, uuids, outpaths, executor,
+                                  exclude=prev, deadline=deadline):
+                    break
 
-                for item in found:
-                    uuids.remove(item)
+                prev, path = path, os.path.dirname(path)
+                if path == prev:
+                    break
 
-            prev = path
-            path = os.path.split(path)[0]
+    def _walk(self, path, uuids, outpaths, executor, exclude=None,
+              deadline=None):
+        """Search the tree below a directory for the state files of the given
+        uuids, with directories scanned concurrently by `executor`.
 
-        # TODO: post-check? Since Bundles know the treanttypes of their
-        # members, should we compare these to what is in outpaths?
+        :Arguments:
+            *path*
+                directory to search below
+            *uuids*
+                set of uuids to find; found uuids are removed
+            *outpaths*
+                dictionary to add found state files to, with uuids as keys
+            *executor*
+                executor to scan directories with
+            *exclude*
+                directory whose tree isn't searched
+            *deadline*
+                time at which to give up the search
 
-        return outpaths
+        :Returns:
+            *finished*
+                ``False`` if the search timed out; ``True`` otherwise
+        """
+        from .manipulators import _scan_dir
+
+        regex = statefile_regex()
+
+        pending = {executor.submit(_scan_dir, path, 0, 0, None, None, regex)}
+        try:
+            while pending and uuids:
+                remaining = None
+                if deadline is not None:
+                    remaining = max(0, deadline - time.time())
+
+                done, pending = wait(pending, timeout=remaining,
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    return False
+
+                for future in done:
+                    statefiles, subdirs = future.result()[:2]
+                    for uuid, statefile in self._statefiles(
+                            statefiles).items():
+                        if uuid in uuids:
+                            outpaths[uuid] = statefile
+                            uuids.remove(uuid)
+
+                    pending.update(
+                        executor.submit(_scan_dir, subdir, 0, 0, None, None,
+                                        regex)
+                        for subdir in subdirs if subdir != exclude)
+        finally:
+            # stop scans not yet started once done
+            for future in pending:
+                future.cancel()
+
+        return True
@@ -0,0 +1,410 @@
+"""
+An optional SQLite index of the Treants, tags, and categories within a
+directory tree.
+
+Creating an :class:`Index` at a project root places a hidden database file in
+that directory. From then on, any Treant below the root keeps its entry in the
+index up to date whenever its state file is written. Queries on tags and
+categories can then be answered from the index alone, without reading each
+Treant's state file.
+
+Failures to update an index, such as when it is locked by another process for
+too long or is read-only, don't fail the writes of state files that caused
+them; a warning is given instead, and the index can be brought up to date
+with :meth:`Index.rebuild`.
+
+"""
+import os
+import sqlite3
+import threading
+import time
+import warnings
+
+from six import string_types
+
+from . import findTreants
+
+# name of the index database file placed in the root directory
+INDEXFILE = '.datreant.index.sqlite'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS treants (
+    uuid TEXT PRIMARY KEY,
+    treanttype TEXT,
+    abspath TEXT,
+    statefile TEXT
+);
+CREATE INDEX IF NOT EXISTS treants_abspath ON treants (abspath);
+CREATE TABLE IF NOT EXISTS tags (
+    uuid TEXT,
+    tag TEXT,
+    PRIMARY KEY (uuid, tag)
+);
+CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag);
+CREATE TABLE IF NOT EXISTS categories (
+    uuid TEXT,
+    key TEXT,
+    value,
+    PRIMARY KEY (uuid, key)
+);
+CREATE INDEX IF NOT EXISTS categories_key_value ON categories (key, value);
+"""
+
+# open indexes, with (pid, path to index file) as keys; connections can't be
+# shared with forked processes
+_INDEXES = dict()
+
+# directories already searched for an index, with (path to the index file
+# found, time of search) as values; ``None`` as the path if no index was found
+_LOOKUPS = dict()
+
+# seconds before directories found to have no index are searched again, since
+# an index may since have been created by another process
+LOOKUP_EXPIRY = 5.0
+
+
+def _cached(lookup, now):
+    """Check whether a cached index search is still valid.
+
+    """
+    indexfile, searched = lookup
+    if indexfile is None:
+        return now - searched < LOOKUP_EXPIRY
+    return os.path.isfile(indexfile)
+
+
+def find_index(path):
+    """Find the index covering the given path, if any.
+
+    The given directory and each of its parents are checked for an index
+    file, and the nearest one is returned.
+
+    Parameters
+    ----------
+    path : str
+        Directory to find the index for.
+
+    Returns
+    -------
+    index : Index
+        Index covering `path`; ``None`` if there is none.
+
+    """
+    path = os.path.abspath(path)
+    now = time.time()
+
+    searched = list()
+    indexfile = None
+    while True:
+        lookup = _LOOKUPS.get(path)
+        if lookup is not None and _cached(lookup, now):
+            indexfile = lookup[0]
+            break
+
+        searched.append(path)
+        candidate = os.path.join(path, INDEXFILE)
+        if os.path.isfile(candidate):
+            indexfile = candidate
+            break
+
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+
+    for item in searched:
+        _LOOKUPS[item] = (indexfile, now)
+
+    if indexfile is None:
+        return None
+    else:
+        return Index(os.path.dirname(indexfile))
+
+
+def update_index(statefile, state):
+    """Update the index covering a Treant, if any, with its current state.
+
+    Parameters
+    ----------
+    statefile : str
+        Path to the Treant's state file.
+    state : dict
+        The Treant's state.
+
+    """
+    try:
+        index = find_index(os.path.dirname(statefile))
+        if index is not None:
+            index.update(statefile, state)
+    except sqlite3.Error as e:
+        _warn(statefile, e)
+
+
+def remove_from_index(statefile):
+    """Remove a Treant from the index covering it, if any.
+
+    Parameters
+    ----------
+    statefile : str
+        Path to the Treant's state file.
+
+    """
+    try:
+        index = find_index(os.path.dirname(statefile))
+        if index is not None:
+            index.remove(findTreants.parse_statefilename(statefile)[1])
+    except sqlite3.Error as e:
+        _warn(statefile, e)
+
+
+def _warn(statefile, error):
+    warnings.warn("Could not update the index covering '{}': {}; rebuild "
+                  "it with Index.rebuild".format(statefile, error))
+
+
+class Index(object):
+    """SQLite index of Treants within a directory tree.
+
+    The index is stored in a hidden file in `root`, which is created if it
+    doesn't already exist. Use :meth:`rebuild` to populate a new index with
+    the Treants already present below `root`.
+
+    Parameters
+    ----------
+    root : str
+        Directory whose tree the index covers.
+
+    """
+    def __new__(cls, root):
+        indexfile = os.path.join(os.path.abspath(root), INDEXFILE)
+        key = (os.getpid(), indexfile)
+        if key not in _INDEXES:
+            index = object.__new__(cls)
+            index._init(indexfile)
+            _INDEXES[key] = index
+        return _INDEXES[key]
+
+    def _init(self, indexfile):
+        self.filename = indexfile
+        self.root = os.path.dirname(indexfile)
+
+        new = not os.path.exists(indexfile)
+        # the connection is shared by threads, but can't be used by several
+        # at once
+        self._conn = sqlite3.connect(indexfile, timeout=60,
+                                     check_same_thread=False)
+        self._lock = threading.RLock()
+
+        # readers aren't blocked by writers, nor writers by readers
+        try:
+            self._conn.execute("PRAGMA journal_mode = WAL")
+        except sqlite3.Error:
+            pass
+
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+
+        # directories may have previously been searched without finding
+        # this index
+        if new:
+            _LOOKUPS.clear()
+
+    def __repr__(self):
+        return "<Index('{}')>".format(self.root)
+
+    def update(self, statefile, state):
+        """Add or update a Treant's entry.
+
+        Parameters
+        ----------
+        statefile : str
+            Path to the Treant's state file.
+        state : dict
+            The Treant's state.
+
+        """
+        with self._lock, self._conn:
+            self._update(statefile, state)
+
+    def _update(self, statefile, state):
+        statefile = os.path.abspath(statefile)
+        treanttype, uuid = os.path.basename(statefile).split('.')[:2]
+        abspath = os.path.dirname(statefile)
+
+        self._conn.execute("INSERT OR REPLACE INTO treants "
+                           "VALUES (?, ?, ?, ?)",
+                           (uuid, treanttype, abspath, statefile))
+        self._conn.execute("DELETE FROM tags WHERE uuid = ?", (uuid,))
+        self._conn.executemany("INSERT OR IGNORE INTO tags VALUES (?, ?)",
+                               [(uuid, tag) for tag in state.get('tags', [])])
+        self._conn.execute("DELETE FROM categories WHERE uuid = ?", (uuid,))
+        self._conn.executemany("INSERT INTO categories VALUES (?, ?, ?)",
+                               [(uuid, key, value) for key, value
+                                in state.get('categories', {}).items()])
+
+    def remove(self, *uuids):
+        """Remove Treants from the index.
+
+        Parameters
+        ----------
+        uuids : str
+            Uuids of Treants to remove.
+
+        """
+        rows = [(uuid,) for uuid in uuids]
+        with self._lock, self._conn:
+            for table in ('treants', 'tags', 'categories'):
+                self._conn.executemany(
+                        "DELETE FROM {} WHERE uuid = ?".format(table), rows)
+
+    def clear(self):
+        """Remove all Treants from the index.
+
+        """
+        with self._lock, self._conn:
+            self._clear()
+
+    def _clear(self):
+        for table in ('treants', 'tags', 'categories'):
+            self._conn.execute("DELETE FROM {}".format(table))
+
+    def rebuild(self):
+        """Rebuild the index from the Treants present below its root.
+
+        """
+        from .manipulators import discover
+
+        members = discover(self.root)
+        with self._lock, self._conn:
+            self._clear()
+            for member in members:
+                with member._read:
+                    self._update(member.filepath, member._state)
+
+    def statefiles(self, path=None, depth=None, treantdepth=None, tags=None,
+                   categories=None):
+        """Get state files of indexed Treants matching the given criteria.
+
+        Parameters
+        ----------
+        path : str
+            Only give Treants within this directory; defaults to the root of
+            the index.
+        depth : int
+            Maximum directory depth below `path` for Treants. ``None``
+            indicates no depth limit.
+        treantdepth : int
+            Maximum number of Treants that may contain a Treant below `path`.
+            ``None`` indicates no Treant depth limit.
+        tags : str, list, tuple, or set
+            Tag expression Treants must match. As for ``Tags.__getitem__``,
+            a list requires all tags, a tuple any of the tags, and a set
+            the absence of at least one of the tags; these can be nested.
+        categories : dict
+            Categories Treants must have, with keys and values as keys and
+            values.
+
+        Returns
+        -------
+        statefiles : list
+            Absolute paths to the state files of matching Treants.
+
+        """
+        if path is None:
+            path = self.root
+        path = os.path.abspath(path)
+
+        clauses = ["(abspath = ? OR substr(abspath, 1, ?) = ?)"]
+        params = [path, len(path) + 1, os.path.join(path, '')]
+
+        # treant depth is judged among all Treants, matching or not
+        if treantdepth is not None:
+            with self._lock:
+                treantdirs = set(
+                        abspath for abspath, in self._conn.execute(
+                            "SELECT abspath FROM treants AS t WHERE " +
+                            clauses[0], params))
+
+        if tags is not None:
+            clause, tagparams = self._tags_clause(tags)
+            clauses.append(clause)
+            params.extend(tagparams)
+
+        for key, value in (categories or {}).items():
+            clauses.append("EXISTS (SELECT 1 FROM categories AS c "
+                           "WHERE c.uuid = t.uuid AND c.key = ? AND "
+                           "c.value = ?)")
+            params.extend([key, value])
+
+        query = ("SELECT abspath, statefile FROM treants AS t WHERE " +
+                 " AND ".join(clauses) + " ORDER BY abspath")
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        if depth is not None:
+            rows = [(abspath, statefile) for abspath, statefile in rows
+                    if self._reldepth(path, abspath) <= depth]
+
+        if treantdepth is not None:
+            out = list()
+            for abspath, statefile in rows:
+                parents = [parent for parent in treantdirs
+                           if abspath.startswith(os.path.join(parent, ''))]
+                if len(parents) <= treantdepth:
+                    out.append((abspath, statefile))
+            rows = out
+
+        return [statefile for abspath, statefile in rows]
+
+    def query(self, path=None, depth=None, treantdepth=None, tags=None,
+              categories=None):
+        """Get a Bundle of indexed Treants matching the given criteria.
+
+        Takes the same parameters as :meth:`statefiles`.
+
+        Returns
+        -------
+        Bundle
+            Bundle of matching Treants.
+
+        """
+        from .collections import Bundle
+
+        return Bundle(self.statefiles(path=path, depth=depth,
+                                      treantdepth=treantdepth, tags=tags,
+                                      categories=categories))
+
+    @staticmethod
+    def _reldepth(path, abspath):
+        relpath = os.path.relpath(abspath, path)
+        if relpath == os.curdir:
+            return 0
+        return len(relpath.split(os.sep))
+
+    def _tags_clause(self, tags):
+        """Build SQL clause and parameters for a tag expression.
+
+        """
+        if isinstance(tags, string_types):
+            return ("EXISTS (SELECT 1 FROM tags AS g WHERE g.uuid = t.uuid "
+                    "AND g.tag = ?)"), [tags]
+        elif isinstance(tags, (list, tuple, set)):
+            clauses, params = list(), list()
+            for item in tags:
+                clause, itemparams = self._tags_clause(item)
+                clauses.append(clause)
+                params.extend(itemparams)
+
+            if not clauses:
+                clause = "0" if isinstance(tags, tuple) else "1"
+            elif isinstance(tags, tuple):
+                clause = "(" + " OR ".join(clauses) + ")"
+            else:
+                clause = "(" + " AND ".join(clauses) + ")"
+
+            if isinstance(tags, set):
+                clause = "NOT " + clause
+            return clause, params
+        else:
+            raise TypeError("Tag expression must be a string, or a list, "
+                            "tuple, or set of them")
@@ -11,6 +11,7 @@ from collections import defaultdict
 from fuzzywuzzy import process
 
 from .collections import Bundle
+from .util import run_async, run_inline
 from . import _TREELIMBS, _LIMBS
 
 
@@ -60,6 +61,44 @@ class Limb(with_metaclass(_Limbmeta, object)):
     def _logger(self):
         return self._treant._logger
 
+    def _run_async(self, function, *args):
+        """Run a function reading the Treant's state without blocking the
+        event loop.
+
+        Other threads can't read the state file while the calling thread holds
+        a lock on it, such as within ``Treant.transaction``; the function is
+        then run right away instead, and a completed future is returned.
+
+        """
+        if self._treant._backend._held():
+            return run_inline(function, *args)
+
+        return run_async(function, *args)
+
+    def _init_state(self, key, default):
+        """Initialize `key` in the Treant's state with `default` if it isn't
+        already there.
+
+        The state file is only checked under a shared lock; it is locked for
+        writing only if the key is missing. If it can't be written, a
+        :exc:`KeyError` is raised.
+
+        """
+        try:
+            with self._treant._read:
+                if key in self._treant._state:
+                    return
+        except (IOError, OSError):
+            pass
+
+        try:
+            with self._treant._write:
+                self._treant._state.setdefault(key, default)
+        except (IOError, OSError):
+            raise KeyError(
+                    ("Missing '{}' data, and cannot write to "
+                     "Treant '{}'".format(key, self._treant.filepath)))
+
 
 @functools.total_ordering
 class Tags(Limb):
@@ -71,23 +110,8 @@ class Tags(Limb):
     def __init__(self, treant):
         super(Tags, self).__init__(treant)
 
-        # init state if tags not already there;
-        # if read-only, check that they are there,
-        # and raise exception if they are not
-        try:
-            with self._treant._write:
-                try:
-                    self._treant._state['tags']
-                except KeyError:
-                    self._treant._state['tags'] = list()
-        except (IOError, OSError):
-            with self._treant._read:
-                try:
-                    self._treant._state['tags']
-                except KeyError:
-                    raise KeyError(
-                            ("Missing 'tags' data, and cannot write to "
-                             "Treant '{}'".format(self._treant.filepath)))
+        # init state if tags not already there
+        self._init_state('tags', list())
 
     def __repr__(self):
         return "<Tags({})>".format(self._list())
@@ -238,11 +262,21 @@ class Tags(Limb):
                 list of all tags
         """
         with self._treant._read:
-            tags = self._treant._state['tags']
+            tags = sorted(self._treant._state['tags'])
 
-        tags.sort()
         return tags
 
+    def aget(self):
+        """Get all tags for the Treant without blocking the event loop.
+
+        For use with :mod:`asyncio`; use as ``tags = await t.tags.aget()``.
+
+        :Returns:
+            *future*
+                awaitable giving a sorted list of all tags
+        """
+        return self._run_async(self._list)
+
     def add(self, *tags):
         """Add any number of tags to the Treant.
 
@@ -346,23 +380,8 @@ class Categories(Limb):
     def __init__(self, treant):
         super(Categories, self).__init__(treant)
 
-        # init state if categories not already there;
-        # if read-only, check that they are there,
-        # and raise exception if they are not
-        try:
-            with self._treant._write:
-                try:
-                    self._treant._state['categories']
-                except KeyError:
-                    self._treant._state['categories'] = dict()
-        except (IOError, OSError):
-            with self._treant._read:
-                try:
-                    self._treant._state['categories']
-                except KeyError:
-                    raise KeyError(
-                            ("Missing 'categories' data, and cannot write to "
-                             "Treant '{}'".format(self._treant.filepath)))
+        # init state if categories not already there
+        self._init_state('categories', dict())
 
     def __repr__(self):
         return "<Categories({})>".format(self._dict())
@@ -474,8 +493,29 @@ class Categories(Limb):
                 dictionary of all categories
 
         """
+        # the state is kept between reads; hand out a copy
         with self._treant._read:
-            return self._treant._state['categories']
+            return dict(self._treant._state['categories'])
+
+    def aget(self, keys=None):
+        """Get values for given `keys` without blocking the event loop.
+
+        For use with :mod:`asyncio`; use as
+        ``values = await t.categories.aget(keys)``.
+
+        :Arguments:
+            *keys*
+                key(s) of values to get, as for ``Categories.__getitem__``;
+                if ``None``, all categories are given as a dictionary
+
+        :Returns:
+            *future*
+                awaitable giving value(s) corresponding to given key(s)
+        """
+        if keys is None:
+            return self._run_async(self._dict)
+        else:
+            return self._run_async(self.__getitem__, keys)
 
     def add(self, categorydict=None, **categories):
         """Add any number of categories to the Treant.
@@ -553,8 +593,7 @@ class Categories(Limb):
             *keys*
                 keys present among categories
         """
-        with self._treant._read:
-            return self._treant._state['categories'].keys()
+        return self._dict().keys()
 
     def values(self):
         """Get category values.
@@ -563,5 +602,4 @@ class Categories(Limb):
             *values*
                 values present among categories
         """
-        with self._treant._read:
-            return self._treant._state['categories'].values()
+        return self._dict().values()
@@ -0,0 +1,169 @@
+"""
+A persistent cache of the last known locations of Treants, shared across
+sessions and processes.
+
+The state file of each Treant is recorded by uuid whenever the Treant is
+created or moved, and whenever a :class:`~datreant.core.findTreants.Foxhound`
+finds it. Treants that have moved since a Bundle last saw them are then looked
+up here before the filesystem is searched.
+
+The cache is disabled by default, since recording each new Treant costs a
+write to it. It is enabled by setting the ``DATREANT_LOCATIONS`` environment
+variable, or :data:`CACHEFILE`, to the path of an SQLite database to use,
+such as ``~/.cache/datreant/locations.sqlite``; the database is created if
+it doesn't exist. Failures to open or write the cache are ignored, since it
+is only ever a hint.
+
+"""
+import os
+import sqlite3
+import threading
+
+from . import findTreants
+
+
+# path to the cache database; ``None`` or empty to disable the cache
+CACHEFILE = os.environ.get('DATREANT_LOCATIONS') or None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS locations (
+    uuid TEXT PRIMARY KEY,
+    statefile TEXT
+);
+"""
+
+# open connections, with (pid, path to cache file) as keys; ``None`` as a
+# value if the cache couldn't be opened. Connections can't be shared with
+# forked processes
+_CONNECTIONS = dict()
+
+# connections are shared by threads, but can't be used by several at once
+_LOCK = threading.Lock()
+
+
+def _connect():
+    """Get a connection to the cache database, or ``None`` if disabled or it
+    can't be opened.
+
+    """
+    if not CACHEFILE:
+        return None
+
+    key = (os.getpid(), CACHEFILE)
+    if key not in _CONNECTIONS:
+        try:
+            cachedir = os.path.dirname(CACHEFILE)
+            if cachedir and not os.path.isdir(cachedir):
+                os.makedirs(cachedir)
+            conn = sqlite3.connect(CACHEFILE, timeout=60,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            with conn:
+                conn.executescript(_SCHEMA)
+        except (OSError, sqlite3.Error):
+            conn = None
+        _CONNECTIONS[key] = conn
+
+    return _CONNECTIONS[key]
+
+
+def record(*statefiles):
+    """Record the locations of Treants.
+
+    Parameters
+    ----------
+    statefiles : str
+        Paths to the state files of Treants; paths that aren't state files
+        are skipped.
+
+    """
+    conn = _connect()
+    if conn is None:
+        return
+
+    rows = list()
+    for statefile in statefiles:
+        parsed = findTreants.parse_statefilename(statefile)
+        if parsed:
+            rows.append((parsed[1], os.path.abspath(statefile)))
+
+    if not rows:
+        return
+
+    with _LOCK:
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO locations "
+                                 "VALUES (?, ?)", rows)
+        except sqlite3.Error:
+            pass
+
+
+def lookup(*uuids):
+    """Get the recorded locations of Treants.
+
+    Recorded state files that no longer exist are forgotten.
+
+    Parameters
+    ----------
+    uuids : str
+        Uuids of Treants to look up.
+
+    Returns
+    -------
+    statefiles : dict
+        Absolute paths to state files, with uuids as keys; only Treants with
+        a recorded state file that exists are included.
+
+    """
+    conn = _connect()
+    if conn is None or not uuids:
+        return dict()
+
+    rows = list()
+    with _LOCK:
+        try:
+            # stay under SQLite's limit on the number of parameters
+            for i in range(0, len(uuids), 500):
+                chunk = uuids[i:i + 500]
+                rows.extend(conn.execute(
+                    "SELECT uuid, statefile FROM locations WHERE uuid IN "
+                    "({})".format(", ".join("?" * len(chunk))), chunk))
+        except sqlite3.Error:
+            return dict()
+
+    statefiles = dict()
+    stale = list()
+    for uuid, statefile in rows:
+        if os.path.exists(statefile):
+            statefiles[uuid] = statefile
+        else:
+            stale.append(uuid)
+
+    if stale:
+        forget(*stale)
+
+    return statefiles
+
+
+def forget(*uuids):
+    """Remove Treants from the cache.
+
+    Parameters
+    ----------
+    uuids : str
+        Uuids of Treants to remove.
+
+    """
+    conn = _connect()
+    if conn is None or not uuids:
+        return
+
+    with _LOCK:
+        try:
+            with conn:
+                conn.executemany("DELETE FROM locations WHERE uuid = ?",
+                                 [(uuid,) for uuid in uuids])
+        except sqlite3.Error:
+            pass
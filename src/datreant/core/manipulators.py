@@ -2,17 +2,29 @@
 User-level functions for manipulating Treants.
 
 """
-import fnmatch
 import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from six.moves import range
 
-from . import _TREANTS
+from . import locations
+from .findTreants import statefile_regex, statefile2record, path2treant
+from .index import find_index
 
 
-def discover(dirpath='.', depth=None, treantdepth=None):
+def discover(dirpath='.', depth=None, treantdepth=None, index=False,
+             workers=1):
     """Find all Treants within given directory, recursively.
 
+    If `index` is ``True``, Treants are looked up in the
+    :class:`~datreant.core.index.Index` covering `dirpath` instead of
+    walking the filesystem.
+
+    For `workers` > 1, subdirectories are scanned concurrently by a pool of
+    threads; this can greatly speed up discovery on network filesystems.
+    Members are added to the Bundle as they are found, so their order is not
+    guaranteed in this case.
+
     Parameters
     ----------
     dirpath : string, Tree
@@ -24,6 +36,11 @@ def discover(dirpath='.', depth=None, treantdepth=None):
     treantdepth : int
         Maximum depth of Treants to tolerate while traversing in search
         of Treants. ``None`` indicates no Treant depth limit.
+    index : bool
+        If ``True``, use the index covering `dirpath`; raises ``ValueError``
+        if there is none.
+    workers : int
+        Number of threads to use for scanning directories.
 
     Returns
     -------
@@ -32,6 +49,70 @@ def discover(dirpath='.', depth=None, treantdepth=None):
 
     """
     from .collections import Bundle
+
+    found = Bundle()
+    for statefiles in _iter_statefiles(dirpath, depth=depth,
+                                       treantdepth=treantdepth, index=index,
+                                       workers=workers):
+        found.add(*statefiles)
+
+    return found
+
+
+def idiscover(dirpath='.', depth=None, treantdepth=None, index=False,
+              workers=1, as_treants=True):
+    """Find all Treants within given directory, recursively, yielding each as
+    it is found.
+
+    This is the generator form of :func:`discover`; work on found Treants can
+    begin before the search is complete, and memory use doesn't grow with the
+    number of Treants found.
+
+    Parameters
+    ----------
+    dirpath : string, Tree
+        Directory within which to search for Treants. May also be an existing
+        Tree.
+    depth : int
+        Maximum directory depth to tolerate while traversing in search of
+        Treants. ``None`` indicates no depth limit.
+    treantdepth : int
+        Maximum depth of Treants to tolerate while traversing in search
+        of Treants. ``None`` indicates no Treant depth limit.
+    index : bool
+        If ``True``, use the index covering `dirpath`; raises ``ValueError``
+        if there is none.
+    workers : int
+        Number of threads to use for scanning directories.
+    as_treants : bool
+        If ``True``, yield Treant instances; otherwise, yield
+        :class:`~datreant.core.findTreants.TreantRecord` tuples of uuid,
+        treanttype, and state file path obtained without opening the state
+        file.
+
+    Yields
+    ------
+    treant : Treant or TreantRecord
+        Each Treant found.
+
+    """
+    for statefiles in _iter_statefiles(dirpath, depth=depth,
+                                       treantdepth=treantdepth, index=index,
+                                       workers=workers):
+        if as_treants:
+            for treant in path2treant(*statefiles):
+                yield treant
+        else:
+            for statefile in statefiles:
+                yield statefile2record(statefile)
+
+
+def _iter_statefiles(dirpath, depth=None, treantdepth=None, index=False,
+                     workers=1):
+    """Yield lists of state files found within `dirpath`, either from its
+    index or by walking the filesystem.
+
+    """
     from .trees import Tree
 
     if isinstance(dirpath, Tree):
@@ -40,21 +121,45 @@ def discover(dirpath='.', depth=None, treantdepth=None):
 
         dirpath = dirpath.abspath
 
-    found = list()
+    if index:
+        idx = find_index(dirpath)
+        if idx is None:
+            raise ValueError("No index covers '{}'".format(dirpath))
+
+        yield idx.statefiles(dirpath, depth=depth, treantdepth=treantdepth)
+    else:
+        for statefiles in _walk_statefiles(dirpath, depth=depth,
+                                           treantdepth=treantdepth,
+                                           workers=workers):
+            yield statefiles
+
+
+def _walk_statefiles(dirpath, depth=None, treantdepth=None, workers=1):
+    """Walk directory tree, yielding lists of the state files found in each
+    directory.
 
+    For `workers` > 1, directories are scanned concurrently in a pool of
+    threads, and lists are yielded as each directory is done.
+
+    """
+    if workers is not None and workers > 1:
+        for statefiles in _walk_statefiles_parallel(dirpath, depth,
+                                                    treantdepth, workers):
+            yield statefiles
+        return
+
+    regex = statefile_regex()
     startdepth = len(dirpath.split(os.sep))
     treantdirs = set()
 
     for root, dirs, files in os.walk(dirpath):
-        for treanttype in _TREANTS:
-            outnames = fnmatch.filter(files,
-                                      "{}.*.json".format(treanttype))
+        outnames = [file for file in files if regex.match(file)]
 
-            if treantdepth is not None and outnames:
-                treantdirs.add(root)
+        if treantdepth is not None and outnames:
+            treantdirs.add(root)
 
-            paths = [os.path.join(root, file) for file in outnames]
-            found.extend(paths)
+        if outnames:
+            yield [os.path.join(root, file) for file in outnames]
 
         # depth check; if too deep, empty dirs to avoid downward traversal
         if depth is not None and len(root.split(os.sep)) - startdepth >= depth:
@@ -77,4 +182,119 @@ def discover(dirpath='.', depth=None, treantdepth=None):
                     dirs.pop()
                 continue
 
-    return Bundle(found)
+
+def _walk_statefiles_parallel(dirpath, depth, treantdepth, workers):
+    """Walk directory tree with a pool of threads scanning directories.
+
+    """
+    regex = statefile_regex()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(_scan_dir, dirpath, 0, 0, depth,
+                                   treantdepth, regex)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                statefiles, subdirs, level, ntreants = future.result()
+                for subdir in subdirs:
+                    pending.add(executor.submit(_scan_dir, subdir, level + 1,
+                                                ntreants, depth, treantdepth,
+                                                regex))
+                if statefiles:
+                    yield statefiles
+
+
+def _scan_dir(path, level, ntreants, depth, treantdepth, regex):
+    """Scan a single directory for state files and subdirectories.
+
+    Parameters
+    ----------
+    path : str
+        Directory to scan.
+    level : int
+        Depth of directory below the top of the walk.
+    ntreants : int
+        Number of Treants in directories above this one, up to the top of the
+        walk.
+    depth, treantdepth : int
+        Limits as for :func:`discover`; subdirectories beyond these aren't
+        returned.
+    regex : compiled regular expression
+        Expression matching state file names.
+
+    Returns
+    -------
+    statefiles : list
+        Paths to state files in directory.
+    subdirs : list
+        Paths to subdirectories to scan next.
+    level : int
+        Depth of directory, as given.
+    ntreants : int
+        Number of Treants in this directory and those above it.
+
+    """
+    statefiles = list()
+    subdirs = list()
+
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return statefiles, subdirs, level, ntreants
+
+    for entry in entries:
+        try:
+            isdir = entry.is_dir()
+        except OSError:
+            isdir = False
+
+        # like ``os.walk``, we don't follow symlinks to directories
+        if isdir:
+            if not entry.is_symlink():
+                subdirs.append(entry.path)
+        elif regex.match(entry.name):
+            statefiles.append(entry.path)
+
+    if statefiles:
+        ntreants += 1
+
+    if ((depth is not None and level >= depth) or
+            (treantdepth is not None and ntreants > treantdepth)):
+        subdirs = list()
+
+    return statefiles, subdirs, level, ntreants
+
+
+def convert(treant, ext):
+    """Convert the state file of a Treant to another format.
+
+    Parameters
+    ----------
+    treant : Treant or string
+        Treant, or path to its directory or state file, to convert.
+    ext : string
+        Extension of the state file format to convert to, e.g. ``'json'``
+        or ``'msgpack'``.
+
+    Returns
+    -------
+    treant : Treant
+        The converted Treant; if a Treant was given, it is updated in place to
+        use its new state file.
+
+    """
+    from .backends.statefiles import convert_treantfile
+    from .findTreants import path2treant
+    from .treants import Treant
+
+    if not isinstance(treant, Treant):
+        treants = path2treant(treant)
+        if len(treants) != 1:
+            raise ValueError("Path must give exactly one Treant")
+        treant = treants[0]
+
+    statefile = convert_treantfile(treant.filepath, ext)
+    treant._regenerate(statefile)
+    locations.record(statefile)
+
+    return treant
@@ -0,0 +1,220 @@
+"""
+A small expression language for selecting Treants by their tags and
+categories.
+
+Expressions use Python syntax, and are evaluated over whole columns of member
+metadata at once rather than member by member::
+
+    >>> b.query("temp > 300 and solvent == 'water'")
+    >>> b.query("'ghost' in tags and not speed >= 4")
+    >>> b.query("categories['ring count'] in (5, 6)")
+
+Bare names refer to categories, while ``tags`` is the set of each member's
+tags. Categories with keys that aren't valid names can be given with
+``categories['key']``. A category a member doesn't have is ``None`` in
+equality tests; other comparisons involving it are false for that member.
+
+"""
+import ast
+import operator
+
+from six import string_types
+
+_BOOLOPS = {ast.And: all, ast.Or: any}
+
+_CMPOPS = {ast.Eq: operator.eq,
+           ast.NotEq: operator.ne,
+           ast.Lt: operator.lt,
+           ast.LtE: operator.le,
+           ast.Gt: operator.gt,
+           ast.GtE: operator.ge,
+           ast.In: lambda a, b: a in b,
+           ast.NotIn: lambda a, b: a not in b}
+
+if hasattr(ast, 'Constant'):
+    _LITERALS = (ast.Constant,)
+else:
+    _LITERALS = (ast.Num, ast.Str, ast.Bytes,
+                 getattr(ast, 'NameConstant', ast.Num))
+
+
+class Query(object):
+    """Compiled query expression.
+
+    Parameters
+    ----------
+    expr : str
+        Expression to compile.
+
+    Raises
+    ------
+    ValueError
+        If `expr` isn't a valid query expression.
+
+    """
+    def __init__(self, expr):
+        self.expr = expr
+        self.categories = set()
+        self.tags = False
+
+        try:
+            tree = ast.parse(expr.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError("Invalid query '{}': {}".format(expr, e))
+
+        self._evaluate = self._compile(tree.body)
+
+    def __repr__(self):
+        return "<Query({!r})>".format(self.expr)
+
+    def mask(self, collection, workers=None):
+        """Evaluate the query over the members of a collection.
+
+        The state file of each member is read once.
+
+        Parameters
+        ----------
+        collection : Bundle
+            Collection of Treants to evaluate the query for.
+        workers : int
+            Number of threads to use for reading state files; defaults to
+            the collection's setting.
+
+        Returns
+        -------
+        list
+            Booleans giving whether each member matches, in member order.
+
+        """
+        rows = collection._read_members(self._read, workers=workers)
+
+        columns = {key: [categories.get(key) for tags, categories in rows]
+                   for key in self.categories}
+        if self.tags:
+            columns[None] = [tags for tags, categories in rows]
+
+        return [bool(value) for value in self._evaluate(columns, len(rows))]
+
+    def _read(self, member):
+        with member._read:
+            state = member._state
+            tags = set(state.get('tags', ())) if self.tags else None
+            categories = dict(state.get('categories', {}))
+
+        return tags, categories
+
+    def _compile(self, node):
+        """Build a function giving the column of values of an expression node.
+
+        Functions take the dict of metadata columns and the number of members
+        as arguments.
+
+        """
+        if isinstance(node, ast.BoolOp):
+            reduce_ = _BOOLOPS[type(node.op)]
+            operands = [self._compile(value) for value in node.values]
+
+            def evaluate(columns, n):
+                values = [operand(columns, n) for operand in operands]
+                return [reduce_(row) for row in zip(*values)]
+
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            operand = self._compile(node.operand)
+
+            def evaluate(columns, n):
+                return [not value for value in operand(columns, n)]
+
+        elif isinstance(node, ast.Compare):
+            ops = [self._cmpop(op) for op in node.ops]
+            operands = [self._compile(value)
+                        for value in [node.left] + node.comparators]
+
+            def evaluate(columns, n):
+                values = [operand(columns, n) for operand in operands]
+                out = [True] * n
+                for i, op in enumerate(ops):
+                    out = [result and _compare(op, a, b) for result, a, b
+                           in zip(out, values[i], values[i + 1])]
+                return out
+
+        elif isinstance(node, ast.Name) and node.id == 'tags':
+            self.tags = True
+
+            def evaluate(columns, n):
+                return columns[None]
+
+        elif isinstance(node, ast.Name) and node.id in ('True', 'False',
+                                                        'None'):
+            return self._constant({'True': True, 'False': False,
+                                   'None': None}[node.id])
+
+        elif isinstance(node, ast.Name):
+            return self._category(node.id)
+
+        elif (isinstance(node, ast.Subscript) and
+                isinstance(node.value, ast.Name) and
+                node.value.id == 'categories'):
+            key = node.slice
+            if isinstance(key, getattr(ast, 'Index', ())):
+                key = key.value
+            key = self._literal(key)
+            if not isinstance(key, string_types):
+                raise ValueError("Invalid query '{}': category keys must be "
+                                 "strings".format(self.expr))
+            return self._category(key)
+
+        elif isinstance(node, (ast.Tuple, ast.List, ast.Set) + _LITERALS):
+            return self._constant(self._literal(node))
+
+        elif (isinstance(node, ast.UnaryOp) and
+                isinstance(node.op, ast.USub)):
+            return self._constant(self._literal(node))
+
+        else:
+            raise ValueError("Invalid query '{}': unsupported "
+                             "expression".format(self.expr))
+
+        return evaluate
+
+    def _cmpop(self, op):
+        try:
+            return _CMPOPS[type(op)]
+        except KeyError:
+            raise ValueError("Invalid query '{}': unsupported "
+                             "comparison".format(self.expr))
+
+    def _category(self, key):
+        self.categories.add(key)
+
+        def evaluate(columns, n):
+            return columns[key]
+
+        return evaluate
+
+    @staticmethod
+    def _constant(value):
+        def evaluate(columns, n):
+            return [value] * n
+
+        return evaluate
+
+    def _literal(self, node):
+        try:
+            return ast.literal_eval(node)
+        except ValueError:
+            raise ValueError("Invalid query '{}': expected a "
+                             "literal".format(self.expr))
+
+
+def _compare(op, a, b):
+    """Compare two values, giving ``False`` for missing values or values that
+    can't be compared.
+
+    """
+    if a is None or b is None:
+        return op(a, b) if op in (operator.eq, operator.ne) else False
+
+    try:
+        return op(a, b)
+    except TypeError:
+        return False
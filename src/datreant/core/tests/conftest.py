@@ -0,0 +1,14 @@
+import pytest
+
+from datreant.core import locations
+
+
+@pytest.fixture(autouse=True)
+def cachefile(tmpdir_factory, monkeypatch):
+    """Enable the location cache for tests, keeping it in a temporary
+    directory.
+
+    """
+    path = tmpdir_factory.getbasetemp().join('locations.sqlite')
+    monkeypatch.setattr(locations, 'CACHEFILE', str(path))
+    return path
@@ -0,0 +1,259 @@
+"""Tests for state file backends.
+
+"""
+
+import json
+import os
+
+import pytest
+
+import datreant.core as dtr
+from datreant.core.backends.core import (_JSONCODECS, register_json_codec,
+                                         get_json_codec, merge_state)
+from datreant.core.backends.statefiles import TreantFile, TreantMsgpackFile
+from datreant.core.manipulators import discover, convert
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class MsgpackTreant(dtr.Treant):
+    _treanttype = 'MsgpackTreant'
+    _backendclass = TreantMsgpackFile
+
+
+class TestFileSerial:
+
+    @pytest.fixture
+    def treant(self, tmpdir):
+        with tmpdir.as_cwd():
+            t = dtr.Treant('sprout', tags=['bark'],
+                           categories={'colour': 'green'})
+        return t
+
+    def test_read_cached(self, treant):
+        with treant._read:
+            state = treant._state
+
+        # unchanged file should not be deserialized again
+        with treant._read:
+            assert treant._state is state
+
+    def test_read_copies(self, treant):
+        # modifying what was read doesn't touch the cached state
+        state = treant.state
+        state['categories']['colour'] = 'red'
+        state['tags'].append('leaf')
+        treant.categories._dict()['colour'] = 'blue'
+
+        assert treant.categories['colour'] == 'green'
+        assert list(treant.categories.values()) == ['green']
+        assert list(treant.tags) == ['bark']
+
+    def test_read_after_external_write(self, treant):
+        # another instance writing the same file invalidates our cache
+        other = dtr.Treant(treant.filepath)
+        assert 'leaf' not in treant.tags
+
+        other.tags.add('leaf')
+        assert 'leaf' in treant.tags
+
+        other.categories['colour'] = 'brown'
+        assert treant.categories['colour'] == 'brown'
+
+    def test_failed_write_invalidates(self, treant):
+        with pytest.raises(TypeError):
+            treant.categories.add({'age': 3, 'height': object()})
+
+        # partial modification never made it to disk, so shouldn't be seen
+        assert 'age' not in treant.categories
+
+    def test_buffer(self, treant):
+        with treant._read:
+            assert treant._backend._buffer()
+        assert not treant._backend._buffer()
+
+        treant.tags.add('leaf')
+        treant.categories['colour'] = 'red'
+
+        # nothing is written while buffering
+        other = dtr.Treant(treant.filepath)
+        assert set(other.tags) == {'bark'}
+
+        base, state = treant._backend._unbuffer()
+        assert base['tags'] == ['bark']
+        assert set(state['tags']) == {'bark', 'leaf'}
+
+        # unbuffered changes are dropped
+        assert set(treant.tags) == {'bark'}
+        assert treant.categories['colour'] == 'green'
+
+
+def test_merge_state():
+    base = {'tags': ['a', 'b'], 'categories': {'x': 1, 'y': 2}}
+    new = {'tags': ['a', 'c'], 'categories': {'x': 1, 'z': 3}}
+    current = {'tags': ['a', 'b', 'd'], 'categories': {'x': 5, 'y': 2},
+               'other': [[1]]}
+
+    assert merge_state(base, new, current) == {
+            'tags': ['a', 'd', 'c'], 'categories': {'x': 5, 'z': 3},
+            'other': [[1]]}
+    assert merge_state(base, base, current) == current
+    assert merge_state([[1]], [[2]], [[3]]) == [[2]]
+
+
+class TestJSONCodecs:
+
+    @pytest.mark.parametrize('codec', list(_JSONCODECS))
+    def test_roundtrip(self, tmpdir, codec):
+        state = {'tags': ['bark', u'écorce'],
+                 'categories': {'age': 3, 'height': 1.5, 'colour': 'green',
+                                'tall': True}}
+
+        tf = TreantFile(os.path.join(tmpdir.strpath, 'state.json'),
+                        codec=codec)
+        with tf.write() as s:
+            s.update(state)
+
+        # any codec can read what another wrote
+        for other in _JSONCODECS:
+            tf2 = TreantFile(tf.filename, codec=other)
+            with tf2.read() as s:
+                assert s == state
+
+    @pytest.mark.parametrize('codec', list(_JSONCODECS))
+    def test_nan_bigint(self, tmpdir, codec):
+        filename = os.path.join(tmpdir.strpath, 'state.json')
+
+        # state files written by the standard library can always be read
+        with open(filename, 'w') as f:
+            json.dump({'categories': {'ratio': float('nan'),
+                                      'big': 2**70}}, f)
+
+        tf = TreantFile(filename, codec=codec)
+        with tf.read() as s:
+            assert s['categories']['ratio'] != s['categories']['ratio']
+            assert s['categories']['big'] == 2**70
+
+        with tf.write() as s:
+            s['categories']['bigger'] = 2**80
+        with TreantFile(filename, codec='json').read() as s:
+            assert s['categories']['bigger'] == 2**80
+
+    @pytest.mark.parametrize('codec', list(_JSONCODECS))
+    def test_nonfinite(self, tmpdir, codec):
+        # non-finite floats written by any codec read back as such, not as
+        # ``None``
+        filename = os.path.join(tmpdir.strpath, 'state.json')
+        tf = TreantFile(filename, codec=codec)
+        with tf.write() as s:
+            s['categories'] = {'ratio': float('nan'), 'top': float('inf'),
+                               'missing': None}
+
+        for other in _JSONCODECS:
+            with TreantFile(filename, codec=other).read() as s:
+                categories = s['categories']
+                assert categories['ratio'] != categories['ratio']
+                assert categories['top'] == float('inf')
+                assert categories['missing'] is None
+
+    def test_default_codec(self, tmpdir):
+        # the fastest installed codec is used by default
+        assert TreantFile(os.path.join(tmpdir.strpath, 'state.json'))._loads \
+            is _JSONCODECS[list(_JSONCODECS)[0]][0]
+        if 'orjson' in _JSONCODECS:
+            assert list(_JSONCODECS)[0] == 'orjson'
+
+        with tmpdir.as_cwd():
+            t = dtr.Treant('sprout', categories={'big': 2**70,
+                                                 'ratio': float('nan')})
+
+        t = dtr.Treant(t.filepath)
+        assert t.categories['big'] == 2**70
+        assert t.categories['ratio'] != t.categories['ratio']
+
+    def test_unknown_codec(self, tmpdir):
+        with pytest.raises(ValueError):
+            TreantFile(os.path.join(tmpdir.strpath, 'state.json'),
+                       codec='not-a-codec')
+
+    def test_register_codec(self, tmpdir):
+        calls = []
+
+        def dumps(state):
+            calls.append(state)
+            return json.dumps(state).encode('utf-8')
+
+        register_json_codec('counting', json.loads, dumps)
+        try:
+            tf = TreantFile(os.path.join(tmpdir.strpath, 'state.json'),
+                            codec='counting')
+            with tf.write() as s:
+                s['tags'] = ['bark']
+            assert len(calls) == 1
+        finally:
+            _JSONCODECS.pop('counting')
+
+    def test_treant_codec(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(dtr.Treant, '_jsoncodec', 'json')
+        with tmpdir.as_cwd():
+            t = dtr.Treant('sprout', tags=['bark'])
+
+        assert t._backend._loads is get_json_codec('json')[0]
+        assert 'bark' in dtr.Treant(t.filepath).tags
+
+
+@pytest.mark.skipif(msgpack is None, reason="msgpack not installed")
+class TestMsgpackFile:
+
+    @pytest.fixture
+    def treant(self, tmpdir):
+        with tmpdir.as_cwd():
+            t = MsgpackTreant('sprout', tags=['bark'],
+                              categories={'colour': 'green', 'age': 3})
+        return t
+
+    def test_statefile(self, treant):
+        assert treant.filepath.endswith('.msgpack')
+        assert isinstance(treant._backend, TreantMsgpackFile)
+
+    def test_regenerate(self, treant):
+        t2 = dtr.Treant(treant.abspath)
+        assert isinstance(t2._backend, TreantMsgpackFile)
+        assert 'bark' in t2.tags
+        assert t2.categories == {'colour': 'green', 'age': 3}
+
+        t3 = MsgpackTreant(treant.filepath)
+        assert t3.uuid == treant.uuid
+
+    def test_discover(self, treant, tmpdir):
+        with tmpdir.as_cwd():
+            dtr.Treant('tree')
+            b = discover('.')
+
+        assert len(b) == 2
+        assert treant in b
+
+    def test_rename(self, treant):
+        treant.name = 'seedling'
+        assert treant.filepath.endswith('.msgpack')
+        assert 'bark' in treant.tags
+
+    def test_convert(self, treant):
+        oldpath = treant.filepath
+
+        convert(treant, 'json')
+        assert treant.filepath.endswith('.json')
+        assert not os.path.exists(oldpath)
+        assert isinstance(treant._backend, TreantFile)
+        assert treant.categories == {'colour': 'green', 'age': 3}
+
+        t2 = convert(treant.filepath, 'msgpack')
+        assert t2.filepath == oldpath
+        assert 'bark' in t2.tags
+
+    def test_convert_unknown(self, treant):
+        with pytest.raises(ValueError):
+            convert(treant, 'xml')
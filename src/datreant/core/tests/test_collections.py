@@ -2,10 +2,20 @@
 
 """
 
+import asyncio
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import TimeoutError
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest.mock import patch
+
 import numpy as np
 import pytest
 
 import datreant.core as dtr
+from datreant.core.limbs import Categories
 
 
 def do_stuff(cont):
@@ -16,6 +26,22 @@ def return_nothing(cont):
     b = cont.name + cont.uuid
 
 
+def get_name(member):
+    return member.name
+
+
+def fail_on_hark(member):
+    if member.name == 'hark':
+        raise ValueError("no harks")
+    return member.name
+
+
+def hang_on_hark(member):
+    if member.name == 'hark':
+        time.sleep(60)
+    return member.name
+
+
 class CollectionsTests(object):
     """Mixin tests for collections"""
     class TestGetitem(object):
@@ -206,6 +232,16 @@ class TestView(CollectionsTests):
     def test_exists(self, collection, tmpdir):
         pass
 
+    def test_map(self, filled_collection):
+        b, members = filled_collection
+        comp = [member.name for member in members]
+
+        assert b.map(get_name) == comp
+        assert b.map(get_name, processes=2) == comp
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            assert b.map(get_name, executor=executor, chunksize=1) == comp
+
 
 class TestBundle(CollectionsTests):
     """Tests for elements of Bundle"""
@@ -265,6 +301,40 @@ class TestBundle(CollectionsTests):
             t_new = b[n]
             assert t_new == t2
 
+        def test_getitem_name_after_changes(self, filled_collection):
+            b, (t1, t2, t3) = filled_collection
+            b.remove(t1)
+            assert b['curly'][0] == t2
+            assert b['moe'][0] == t3
+
+            b.add(t1)
+            assert b['larry'][0] == t1
+
+            # rename of member through the Bundle's own instance
+            b[0].name = 'shemp'
+            assert b['shemp'][0] == t2
+            assert b[t3.uuid] == t3
+
+            # the old name no longer matches
+            with pytest.raises(KeyError):
+                b['curly']
+            assert b.names == ['shemp', 'moe', 'larry']
+
+        def test_getitem_string_no_scan(self, filled_collection):
+            """Lookups found in the indexes don't check every member"""
+            b, (t1, t2, t3) = filled_collection
+            refresh = patch.object(b, '_refresh_locations',
+                                   side_effect=b._refresh_locations)
+            with refresh as mock:
+                assert b[t2.uuid] == t2
+                assert b['moe'][0] == t3
+                assert all(call[0] for call in mock.call_args_list)
+
+                # only a miss in the name index checks every member
+                t1.name = 'shemp'
+                assert b['shemp'][0] == t1
+                assert mock.call_args_list[-1] == ((),)
+
         def test_getitem_string_KeyError(self, filled_collection):
             b = filled_collection[0]
             with pytest.raises(KeyError):
@@ -304,6 +374,70 @@ class TestBundle(CollectionsTests):
 
             assert t3 not in collection
 
+    def test_add_members_lazy(self, collection, tmpdir):
+        """Adding members by path shouldn't load them until accessed"""
+        with tmpdir.as_cwd():
+            t1 = dtr.Treant('lark')
+            t2 = dtr.Treant('hark')
+            t3 = dtr.Treant('linus')
+
+            with patch.object(dtr.Treant, '_regenerate',
+                              side_effect=AssertionError):
+                collection.add('lark', t2.filepath, dtr.Tree('linus'))
+                collection.add(dtr.Bundle('*ark'))
+
+                assert len(collection) == 3
+                assert collection.uuids == [t1.uuid, t2.uuid, t3.uuid]
+                assert collection.treanttypes == ['Treant'] * 3
+
+            assert collection[0] == t1
+            assert list(collection) == [t1, t2, t3]
+
+    def test_set_operations_lazy(self, collection, tmpdir):
+        """Set operations between Bundles shouldn't load their members"""
+        with tmpdir.as_cwd():
+            t1 = dtr.Treant('lark')
+            t2 = dtr.Treant('hark')
+            t3 = dtr.Treant('linus')
+
+            with patch.object(dtr.Treant, '_regenerate',
+                              side_effect=AssertionError):
+                collection.add('lark', 'hark', 'linus')
+                other = dtr.Bundle('hark', 'linus')
+
+                assert t2 in collection
+                assert (collection - other).uuids == [t1.uuid]
+                assert (collection & other).uuids == [t2.uuid, t3.uuid]
+                assert (collection ^ other[:1]).uuids == [t1.uuid, t3.uuid]
+                assert other < collection
+                assert collection == collection[::-1]
+
+    def test_member_table(self, collection, tmpdir):
+        """Members are stored compactly, with uuids as bytes and shared
+        directories and treant types stored once"""
+        with tmpdir.as_cwd():
+            treants = [dtr.Treant(os.path.join(group, name))
+                       for group in ('birds', 'dogs')
+                       for name in ('lark', 'hark')]
+        collection.add(treants)
+
+        table = collection._state
+        assert len(table._uuids) == 16 * len(treants)
+        assert table._treanttypes == ['Treant']
+        assert len(table._dirs) == 2
+        assert list(table['uuid']) == [t.uuid for t in treants]
+        assert table['abspath'][-1] == os.path.dirname(treants[-1].filepath)
+
+        # names shared by members are indexed by all of their positions
+        assert collection._nameindex['lark'] == [0, 2]
+        collection.remove(treants[0])
+        assert collection._nameindex == {'hark': [0, 2], 'lark': 1}
+        assert collection['lark'][0] == treants[2]
+        assert collection[treants[1].uuid] == treants[1]
+
+        with pytest.raises(ValueError):
+            collection._add_member('not-a-uuid', 'Treant', str(tmpdir))
+
     def test_get_members(self, collection, tmpdir):
         """Access members with indexing and slicing"""
         with tmpdir.as_cwd():
@@ -412,6 +546,276 @@ class TestBundle(CollectionsTests):
         assert collection.map(return_nothing) is None
         assert collection.map(return_nothing, processes=2) is None
 
+    @pytest.mark.parametrize('chunksize', (None, 1, 2, 10))
+    def test_map_executor(self, collection, tmpdir, chunksize):
+        with tmpdir.as_cwd():
+            for name in ('lark', 'hark', 'linus', 'snoopy', 'woodstock'):
+                collection.add(dtr.Treant(name))
+
+        comp = [cont.name + cont.uuid for cont in collection]
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            for i in range(2):
+                assert collection.map(do_stuff, executor=executor,
+                                      chunksize=chunksize) == comp
+
+        # members are rebuilt from their state files without searching for
+        # them
+        with patch.object(dtr.Treant, '_regenerate',
+                          side_effect=AssertionError):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                assert collection.map(do_stuff, executor=executor,
+                                      chunksize=chunksize) == comp
+
+    @pytest.mark.parametrize('processes', (1, 2))
+    def test_imap(self, collection, tmpdir, processes):
+        with tmpdir.as_cwd():
+            for name in ('lark', 'hark', 'linus', 'snoopy', 'woodstock'):
+                collection.add(dtr.Treant(name))
+
+        out = collection.imap(do_stuff, processes=processes, chunksize=2)
+        assert list(out) == [(member, member.name + member.uuid)
+                             for member in collection]
+
+        out = collection.imap_unordered(do_stuff, processes=processes)
+        assert sorted(out) == [(member, member.name + member.uuid)
+                               for member in sorted(collection)]
+
+        # results are given out as they are done
+        released = threading.Event()
+
+        def work(member):
+            if member.name != 'lark':
+                assert released.wait(10)
+            return member.name
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            out = collection.imap(work, executor=executor, chunksize=1)
+            assert next(out)[1] == 'lark'
+            released.set()
+            assert [result for member, result in out] == collection.names[1:]
+
+    @pytest.mark.parametrize('processes', (1, 2))
+    def test_map_on_error(self, collection, tmpdir, processes):
+        with tmpdir.as_cwd():
+            for name in ('lark', 'hark', 'linus'):
+                collection.add(dtr.Treant(name))
+
+        with pytest.raises(ValueError):
+            collection.map(fail_on_hark, processes=processes)
+
+        with pytest.raises(ValueError):
+            collection.map(get_name, on_error='ignore')
+
+        results, failures = collection.map(fail_on_hark, processes=processes,
+                                           on_error='collect')
+        assert results == ['lark', None, 'linus']
+        assert [failure.member for failure in failures] == [collection[1]]
+        assert isinstance(failures[0].exception, ValueError)
+        assert 'no harks' in failures[0].traceback
+
+        out = list(collection.imap(fail_on_hark, processes=processes,
+                                   on_error='collect'))
+        assert out[0] == (collection[0], 'lark')
+        assert out[1][1].member == collection[1]
+        assert isinstance(out[1][1].exception, ValueError)
+
+        # members are tried again after failing
+        calls = Counter()
+
+        def flaky(member):
+            calls[member.name] += 1
+            if calls[member.name] == 1:
+                raise ValueError("not yet")
+            return member.name
+
+        assert collection.map(flaky, retries=1) == ['lark', 'hark', 'linus']
+
+    def test_map_timeout(self, collection, tmpdir):
+        with tmpdir.as_cwd():
+            for name in ('lark', 'hark', 'linus'):
+                collection.add(dtr.Treant(name))
+
+        with pytest.raises(ValueError):
+            collection.map(get_name, timeout=1)
+
+        start = time.time()
+        results, failures = collection.map(hang_on_hark, processes=2,
+                                           on_error='collect', retries=1,
+                                           timeout=1)
+        assert time.time() - start < 30
+        assert results == ['lark', None, 'linus']
+        assert [failure.member for failure in failures] == [collection[1]]
+        assert isinstance(failures[0].exception, TimeoutError)
+
+        with pytest.raises(TimeoutError):
+            collection.map(hang_on_hark, processes=2, timeout=1)
+
+    def test_transaction(self, collection, tmpdir):
+        with tmpdir.as_cwd():
+            t1 = dtr.Treant('lark')
+            t2 = dtr.Treant('hark')
+            t3 = dtr.Treant('linus')
+
+        collection.add(t1, t2, t3)
+
+        with collection.transaction():
+            collection.tags.add('bird')
+            collection.categories['wings'] = 2
+            collection.categories['colour'] = ['brown', 'grey', 'blue']
+
+        for treant, colour in zip((t1, t2, t3), ('brown', 'grey', 'blue')):
+            assert 'bird' in treant.tags
+            assert treant.categories['wings'] == 2
+            assert treant.categories['colour'] == colour
+
+        with pytest.raises(ValueError):
+            with collection.transaction():
+                collection.tags.add('mammal')
+                raise ValueError
+
+        for treant in (t1, t2, t3):
+            assert 'mammal' not in treant.tags
+
+    def test_transaction_merge(self, collection, tmpdir):
+        """Changes made by others during a transaction are kept"""
+        with tmpdir.as_cwd():
+            t1 = dtr.Treant('lark', tags=['bird'], categories={'wings': 2})
+
+        collection.add(t1)
+
+        with collection.transaction():
+            collection.tags.add('brown')
+            collection.categories['legs'] = 2
+
+            other = dtr.Treant(t1.filepath)
+            other.tags.add('flying')
+            other.categories['wings'] = 3
+
+        assert t1.tags == {'bird', 'brown', 'flying'}
+        assert t1.categories['wings'] == 3
+        assert t1.categories['legs'] == 2
+
+    def test_transaction_fd_limit(self, collection, tmpdir):
+        """No file descriptor is held per member during a transaction"""
+        resource = pytest.importorskip('resource')
+        if not os.path.isdir('/proc/self/fd'):
+            pytest.skip("can't count open file descriptors")
+
+        with tmpdir.as_cwd():
+            treants = [dtr.Treant('t{}'.format(i)) for i in range(100)]
+        collection.add(treants)
+
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        limit = len(os.listdir('/proc/self/fd')) + 20
+        resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+        try:
+            with collection.transaction():
+                collection.tags.add('many')
+                collection.categories['size'] = 100
+        finally:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+        for treant in treants:
+            assert 'many' in treant.tags
+            assert treant.categories['size'] == 100
+
+    def test_workers(self, tmpdir, monkeypatch):
+        """Aggregate reads use a pool of threads as set for the Bundle or
+        globally"""
+        with tmpdir.as_cwd():
+            treants = [dtr.Treant(name, tags=['ghost'],
+                                  categories={'speed': speed})
+                       for speed, name in enumerate(('inky', 'blinky',
+                                                     'clyde'))]
+
+        b = dtr.Bundle(treants, workers=3)
+        assert b[:2].workers == 3
+        assert dtr.Bundle(treants).workers is None
+
+        pool = patch('datreant.core.collections.ThreadPoolExecutor',
+                     wraps=ThreadPoolExecutor)
+        with pool as mock:
+            assert b.categories['speed'] == [0, 1, 2]
+            assert b.tags.all == {'ghost'}
+            assert b.query("speed > 0").names == ['blinky', 'clyde']
+            assert mock.call_count == 4
+            mock.assert_called_with(max_workers=3)
+
+            b.workers = None
+            assert b.categories['speed'] == [0, 1, 2]
+            assert mock.call_count == 4
+
+            monkeypatch.setattr(dtr.collections, 'WORKERS', 2)
+            assert b.categories['speed'] == [0, 1, 2]
+            mock.assert_called_with(max_workers=2)
+
+            assert b.categories.groupby('speed', workers=1) == {
+                    0: b[:1], 1: b[1:2], 2: b[2:]}
+            assert mock.call_count == 5
+
+    @pytest.mark.parametrize('workers', (1, 3))
+    def test_async(self, tmpdir, workers):
+        with tmpdir.as_cwd():
+            treants = [dtr.Treant(name, tags=['ghost'],
+                                  categories={'speed': speed})
+                       for speed, name in enumerate(('inky', 'blinky',
+                                                     'clyde'))]
+        b = dtr.Bundle(treants, workers=workers)
+
+        def speedup(treant, amount):
+            treant.categories['speed'] += amount
+            return treant.name
+
+        async def main():
+            names = await b.amap(speedup, amount=10)
+            out = await asyncio.gather(b.categories.aget('speed'),
+                                       b.categories.aget({'speed'}),
+                                       b.tags.aget(('ghost', 'pacman')),
+                                       b[0].tags.aget())
+            return names, out
+
+        loop = asyncio.new_event_loop()
+        try:
+            names, out = loop.run_until_complete(main())
+        finally:
+            loop.close()
+
+        assert names == ['inky', 'blinky', 'clyde']
+        assert out == [[10, 11, 12], {'speed': [10, 11, 12]},
+                       [True, True, True], ['ghost']]
+
+    @pytest.mark.parametrize('scope', ('bundle', 'member'))
+    def test_async_transaction(self, tmpdir, scope):
+        with tmpdir.as_cwd():
+            treants = [dtr.Treant(name, categories={'speed': speed})
+                       for speed, name in enumerate(('inky', 'blinky'))]
+        b = dtr.Bundle(treants, workers=2)
+
+        def speed(treant):
+            return treant.categories['speed']
+
+        async def main():
+            # reading state files locked by this thread from another would
+            # wait forever
+            transaction = (b.transaction() if scope == 'bundle'
+                           else b[0].transaction())
+            with transaction:
+                b.tags.add('ghost')
+                b.categories['speed'] = 5
+                return await asyncio.wait_for(asyncio.gather(
+                        b.categories.aget('speed'),
+                        b.tags.aget('ghost'),
+                        b.amap(speed)), 5)
+
+        loop = asyncio.new_event_loop()
+        try:
+            out = loop.run_until_complete(main())
+        finally:
+            loop.close()
+
+        assert out == [[5, 5], [True, True], [5, 5]]
+
     class TestAggTags:
         """Test behavior of manipulating tags collectively.
 
@@ -763,6 +1167,103 @@ class TestBundle(CollectionsTests):
                 selection = [{'tree', 'new jersey'}, 'deciduous']
                 assert tags.filter(selection) == dtr.Bundle()
 
+        def test_tags_index(self, collection, tmpdir):
+            """Tag lookups are answered from the inverted index, which is
+            updated only for members that changed"""
+            with tmpdir.as_cwd():
+                maple = dtr.Treant('maple', tags=['tree', 'deciduous'])
+                pine = dtr.Treant('pine', tags=['tree', 'evergreen'])
+                rock = dtr.Treant('rock')
+                collection.add(maple, pine, rock)
+                tags = collection.tags
+
+                read = patch.object(tags, '_read_tags',
+                                    side_effect=tags._read_tags)
+                with read as mock:
+                    assert tags['tree'] == [True, True, False]
+                    assert tags.filter(('deciduous', {'tree'})) == \
+                        dtr.Bundle(maple, rock)
+                    assert tags.any == {'tree', 'deciduous', 'evergreen'}
+                    assert mock.call_count == 3
+
+                    # changes made directly to a member are picked up
+                    pine.tags.remove('tree')
+                    assert tags['tree'] == [True, False, False]
+                    assert mock.call_count == 4
+
+                    # as are changes made through the collection
+                    tags.add('plant')
+                    assert tags.all == {'plant'}
+                    assert mock.call_count == 7
+
+                    collection.remove(rock)
+                    assert tags[['plant', {'tree'}]] == [False, True]
+                    assert tags[()] == [False, False]
+
+                assert dtr.Bundle().tags['tree'] == []
+
+        def test_tags_index_transaction(self, collection, tmpdir):
+            """Changes not yet written within a transaction are picked up by
+            the inverted index"""
+            with tmpdir.as_cwd():
+                maple = dtr.Treant('maple', tags=['tree'])
+                pine = dtr.Treant('pine', tags=['tree'])
+                collection.add(maple, pine)
+                tags = collection.tags
+                assert tags['tree'] == [True, True]
+
+                with collection.transaction():
+                    pine.tags.remove('tree')
+                    maple.tags.add('deciduous')
+                    assert tags['tree'] == [True, False]
+                    assert tags.any == {'tree', 'deciduous'}
+
+                assert tags['tree'] == [True, False]
+                assert tags['deciduous'] == [True, False]
+
+        @pytest.mark.parametrize('workers', (1, 4))
+        def test_tags_to_records(self, collection, tmpdir, workers):
+            with tmpdir.as_cwd():
+                maple = dtr.Treant('maple', tags=['tree', 'deciduous'])
+                pine = dtr.Treant('pine', tags=['tree', 'evergreen'])
+                collection.add(maple, pine)
+
+                records = collection.tags.to_records(workers=workers)
+                assert records.dtype.names == ('uuid', 'deciduous',
+                                               'evergreen', 'tree')
+                assert list(records.uuid) == [maple.uuid, pine.uuid]
+                assert list(records.deciduous) == [True, False]
+                assert list(records.tree) == [True, True]
+
+                records = collection.tags.to_records(tags=['evergreen'])
+                assert records.dtype.names == ('uuid', 'evergreen')
+
+        def test_tags_to_records_index(self, collection, tmpdir):
+            with tmpdir.as_cwd():
+                maple = dtr.Treant('maple', tags=['tree', 'uuid'])
+                collection.add(maple)
+
+                with pytest.raises(ValueError, match="`index`"):
+                    collection.tags.to_records()
+
+                records = collection.tags.to_records(index='member')
+                assert records.dtype.names == ('member', 'tree', 'uuid')
+                assert list(records.member) == [maple.uuid]
+                assert list(records['uuid']) == [True]
+
+        def test_tags_to_frame(self, collection, tmpdir):
+            pd = pytest.importorskip('pandas')
+            with tmpdir.as_cwd():
+                maple = dtr.Treant('maple', tags=['tree', 'deciduous'])
+                pine = dtr.Treant('pine', tags=['tree', 'evergreen'])
+                collection.add(maple, pine)
+
+                frame = collection.tags.to_frame()
+                assert list(frame.columns) == ['deciduous', 'evergreen',
+                                               'tree']
+                assert list(frame.index) == [maple.uuid, pine.uuid]
+                assert list(frame['evergreen']) == [False, True]
+
     class TestAggCategories:
         """Test behavior of manipulating categories collectively.
 
@@ -834,6 +1335,68 @@ class TestBundle(CollectionsTests):
                 cat_set = {'bark': bark_list, 'nickname': nick_list}
                 assert cat_set == collection.categories[{'bark', 'nickname'}]
 
+        def test_categories_getitem_one_read(self, collection, tmpdir):
+            with tmpdir.as_cwd():
+                t1 = dtr.Treant('maple', categories={'age': 'seedling'})
+                t2 = dtr.Treant('sequoia', categories={'age': 'adult',
+                                                       'type': 'evergreen'})
+                collection.add(t1, t2)
+
+                _dict = Categories._dict
+                with patch.object(Categories, '_dict', autospec=True,
+                                  side_effect=_dict) as read:
+                    assert collection.categories[['age', 'type']] == [
+                            ['seedling', 'adult'], [None, 'evergreen']]
+                    assert read.call_count == 2
+
+        @pytest.mark.parametrize('workers', (1, 4))
+        def test_categories_to_records(self, collection, tmpdir, workers):
+            with tmpdir.as_cwd():
+                t1 = dtr.Treant('maple', categories={'age': 10,
+                                                     'bark': 'rough'})
+                t2 = dtr.Treant('sequoia', categories={'age': 2000,
+                                                       'type': 'evergreen'})
+                collection.add(t1, t2)
+
+                records = collection.categories.to_records(workers=workers)
+                assert records.dtype.names == ('uuid', 'age', 'bark', 'type')
+                assert list(records.uuid) == [t1.uuid, t2.uuid]
+                assert records.age.dtype.kind == 'i'
+                assert list(records.age) == [10, 2000]
+                assert list(records.type) == [None, 'evergreen']
+
+                records = collection.categories.to_records(scope='all')
+                assert records.dtype.names == ('uuid', 'age')
+
+        def test_categories_to_records_index(self, collection, tmpdir):
+            with tmpdir.as_cwd():
+                t1 = dtr.Treant('maple', categories={'age': 10,
+                                                     'uuid': 'abc'})
+                collection.add(t1)
+
+                with pytest.raises(ValueError, match="`index`"):
+                    collection.categories.to_records()
+
+                records = collection.categories.to_records(index='member')
+                assert records.dtype.names == ('member', 'age', 'uuid')
+                assert list(records.member) == [t1.uuid]
+                assert list(records['uuid']) == ['abc']
+
+        def test_categories_to_frame(self, collection, tmpdir):
+            pd = pytest.importorskip('pandas')
+            with tmpdir.as_cwd():
+                t1 = dtr.Treant('maple', categories={'age': 10,
+                                                     'bark': 'rough'})
+                t2 = dtr.Treant('sequoia', categories={'age': 2000,
+                                                       'type': 'evergreen'})
+                collection.add(t1, t2)
+
+                frame = collection.categories.to_frame(keys=['age', 'type'])
+                assert list(frame.columns) == ['age', 'type']
+                assert list(frame.index) == [t1.uuid, t2.uuid]
+                assert list(frame['age']) == [10, 2000]
+                assert frame['type'][t2.uuid] == 'evergreen'
+
         def test_categories_setitem(self, collection, testtreant, testtreant2,
                                     tmpdir):
             with tmpdir.as_cwd():
@@ -1171,3 +1734,30 @@ class TestBundle(CollectionsTests):
                 # Test key TypeError in groupby
                 with pytest.raises(TypeError) as e:
                     collection.categories.groupby({'health', 'nickname'})
+
+        @pytest.mark.parametrize('workers', (1, 4))
+        def test_categories_groupby_indices(self, collection, tmpdir,
+                                            workers):
+            with tmpdir.as_cwd():
+                t1 = dtr.Treant('maple', categories={'age': 'young',
+                                                     'bark': 'smooth'})
+                t2 = dtr.Treant('sequoia', categories={'age': 'old',
+                                                       'bark': 'fibrous'})
+                t3 = dtr.Treant('oak', categories={'age': 'young',
+                                                   'bark': 'rough'})
+                t4 = dtr.Treant('elm', categories={'bark': 'smooth'})
+                collection.add(t1, t2, t3, t4)
+
+                groups = collection.categories.groupby('age', indices=True,
+                                                       workers=workers)
+                assert groups == {'young': [0, 2], 'old': [1]}
+                assert list(collection[groups['young']]) == [t1, t3]
+
+                groups = collection.categories.groupby(['bark', 'age'],
+                                                       indices=True)
+                assert groups == {('smooth', 'young'): [0],
+                                  ('fibrous', 'old'): [1],
+                                  ('rough', 'young'): [2]}
+
+                groups = collection.categories.groupby('bark')
+                assert list(groups['smooth']) == [t1, t4]
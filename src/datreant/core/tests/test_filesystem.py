@@ -5,6 +5,7 @@
 import datreant.core as dtr
 import pytest
 import os
+import shutil
 import py.path
 
 
@@ -16,3 +17,61 @@ class TestFoxhound:
         with tmpdir.as_cwd():
             t = dtr.Treant('testtreant')
         return t
+
+    def test_check_paths(self, treant, tmpdir):
+        with tmpdir.as_cwd():
+            others = [dtr.Treant(os.path.join('sub', name))
+                      for name in ('a', 'b', 'c')]
+
+            # files that merely contain a uuid aren't state files
+            py.path.local('sub/a').join(others[1].uuid + '.txt').write('')
+
+        uuids = [treant.uuid] + [other.uuid for other in others]
+        paths = {'abspath': [treant.abspath] +
+                 [other.abspath for other in others] * 2}
+        foxhound = dtr.findTreants.Foxhound(treant, uuids + ['missing'],
+                                            paths)
+
+        found = foxhound._check_paths()
+        assert found.pop('missing') is None
+        assert found == {member.uuid: member.filepath
+                         for member in [treant] + others}
+
+    def test_find_treantfile(self, treant, tmpdir):
+        uuid, abspath = treant.uuid, treant.abspath
+        moved = tmpdir.join('a', 'b', 'moved')
+        moved.dirpath().ensure(dir=True)
+        shutil.move(abspath, str(moved))
+
+        foxhound = dtr.findTreants.Foxhound(treant, [uuid],
+                                            {'abspath': [abspath]})
+        found = foxhound.fetch(as_treants=False)
+        assert found == {uuid: dtr.Treant(str(moved)).filepath}
+
+        found = foxhound.fetch()
+        assert found[uuid].abspath == os.path.join(str(moved), '')
+
+    @pytest.mark.parametrize('workers', (1, 4))
+    def test_find_bundle_members(self, tmpdir, workers):
+        with tmpdir.as_cwd():
+            for name in ('a', 'b', 'c'):
+                dtr.Treant(name)
+
+            # members added by path aren't loaded until accessed
+            b = dtr.Bundle('a', 'b', 'c', workers=workers)
+
+            tmpdir.ensure('deep', 'er', dir=True)
+            shutil.move('a', os.path.join('deep', 'er', 'a'))
+            shutil.move('c', os.path.join('deep', 'c'))
+
+        with tmpdir.join('deep', 'er').as_cwd():
+            # search starts below, then moves up from, the working directory
+            assert b.names == ['a', 'b', 'c']
+            assert b.abspaths[0] == os.path.join(str(tmpdir), 'deep', 'er',
+                                                 'a', '')
+
+    def test_search_timeout(self, treant, tmpdir):
+        foxhound = dtr.findTreants.Foxhound(treant, ['missing'],
+                                            {'abspath': [treant.abspath]},
+                                            timeout=0)
+        assert foxhound.fetch(as_treants=False) == {'missing': None}
@@ -0,0 +1,164 @@
+"""Tests for the SQLite index.
+
+"""
+
+import sqlite3
+import threading
+
+import pytest
+from unittest.mock import patch
+
+import datreant.core as dtr
+from datreant.core import index as index_module
+from datreant.core.index import _SCHEMA, Index, INDEXFILE, find_index
+from datreant.core.manipulators import discover
+
+
+@pytest.fixture
+def index(tmpdir):
+    return Index(tmpdir.strpath)
+
+
+@pytest.fixture
+def treants(tmpdir, index):
+    with tmpdir.as_cwd():
+        t1 = dtr.Treant('inky', tags=['ghost', 'cyan'],
+                        categories={'speed': 3, 'nice': True})
+        t2 = dtr.Treant('blinky', tags=['ghost', 'red'],
+                        categories={'speed': 5, 'nice': False})
+        t3 = dtr.Treant('maze/pacman', tags=['yellow'],
+                        categories={'speed': 4.5})
+    return t1, t2, t3
+
+
+def test_find_index(tmpdir, index):
+    assert find_index(tmpdir.mkdir('deep').mkdir('down').strpath) is index
+    assert find_index(tmpdir.dirpath().strpath) is None
+
+
+def test_query_tags(treants, index):
+    t1, t2, t3 = treants
+
+    assert set(index.query(tags='ghost')) == {t1, t2}
+    assert set(index.query(tags=['ghost', 'red'])) == {t2}
+    assert set(index.query(tags=('cyan', 'yellow'))) == {t1, t3}
+    assert set(index.query(tags={'ghost'})) == {t3}
+    assert set(index.query(tags=['ghost', ('red', 'yellow')])) == {t2}
+
+
+def test_query_categories(treants, index):
+    t1, t2, t3 = treants
+
+    assert set(index.query(categories={'speed': 5})) == {t2}
+    assert set(index.query(categories={'speed': 4.5})) == {t3}
+    assert set(index.query(categories={'nice': True})) == {t1}
+    assert set(index.query(tags='ghost',
+                           categories={'nice': False})) == {t2}
+
+
+def test_updates(treants, index):
+    t1, t2, t3 = treants
+
+    t3.tags.add('ghost')
+    t1.categories['speed'] = 5
+    assert set(index.query(tags='ghost')) == {t1, t2, t3}
+    assert set(index.query(categories={'speed': 5})) == {t1, t2}
+
+    with t2.transaction():
+        t2.tags.clear()
+        t2.categories.remove('speed')
+    assert set(index.query(tags='ghost')) == {t1, t3}
+    assert set(index.query(categories={'speed': 5})) == {t1}
+
+
+def test_move(treants, index, tmpdir):
+    t1, t2, t3 = treants
+
+    t1.name = 'clyde'
+    t2.location = tmpdir.join('maze').strpath
+    assert index.statefiles(tags='cyan') == [t1.filepath]
+    assert set(index.query(path=tmpdir.join('maze').strpath)) == {t2, t3}
+
+
+def test_rebuild(treants, index):
+    index.clear()
+    assert len(index.query()) == 0
+
+    index.rebuild()
+    assert set(index.query()) == set(treants)
+
+
+def test_discover(tmpdir, index):
+    with tmpdir.as_cwd():
+        ghosts = ('inky',
+                  'inky/blinky',
+                  'pinky',
+                  'inky/blinky/nothing/clyde')
+
+        for name in ghosts:
+            dtr.Treant(name)
+
+        for depth in (None, 0, 1, 2, 3):
+            for treantdepth in (None, 0, 1, 2):
+                for path in ('.', 'inky', 'pinky'):
+                    assert (set(discover(path, depth=depth,
+                                         treantdepth=treantdepth,
+                                         index=True)) ==
+                            set(discover(path, depth=depth,
+                                         treantdepth=treantdepth)))
+
+
+def test_discover_no_index(tmpdir):
+    with pytest.raises(ValueError):
+        discover(tmpdir.strpath, index=True)
+
+
+def test_update_from_thread(treants, index):
+    t1, t2, t3 = treants
+    errors = list()
+
+    def work():
+        try:
+            t3.tags.add('ghost')
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    thread.join()
+
+    assert errors == []
+    assert set(index.query(tags='ghost')) == {t1, t2, t3}
+
+
+def test_update_error(treants, index):
+    # the state file is written even if the index can't be
+    t1, t2, t3 = treants
+    error = sqlite3.OperationalError("database is locked")
+    with patch.object(Index, '_update', side_effect=error):
+        with pytest.warns(UserWarning, match="database is locked"):
+            t1.tags.add('blue')
+
+    assert 'blue' in dtr.Treant(t1.filepath).tags
+    assert set(index.query(tags='blue')) == set()
+
+    index.rebuild()
+    assert set(index.query(tags='blue')) == {t1}
+
+
+def test_index_created_elsewhere(tmpdir, monkeypatch):
+    # an index created by another process is found once the search for it
+    # has expired
+    root = tmpdir.mkdir('project')
+    with root.as_cwd():
+        t1 = dtr.Treant('inky')
+    assert find_index(root.strpath) is None
+
+    conn = sqlite3.connect(root.join(INDEXFILE).strpath)
+    conn.executescript(_SCHEMA)
+    conn.close()
+    assert find_index(root.strpath) is None
+
+    monkeypatch.setattr(index_module, 'LOOKUP_EXPIRY', 0)
+    t1.tags.add('ghost')
+    assert set(find_index(root.strpath).query(tags='ghost')) == {t1}
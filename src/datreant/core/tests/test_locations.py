@@ -0,0 +1,93 @@
+"""Tests for the location cache.
+
+"""
+
+import importlib
+import os
+import shutil
+
+import pytest
+from unittest.mock import patch
+
+import datreant.core as dtr
+from datreant.core import locations
+from datreant.core.findTreants import Foxhound, path2treant
+
+
+@pytest.fixture
+def treant(tmpdir):
+    with tmpdir.as_cwd():
+        t = dtr.Treant('sprout')
+    return t
+
+
+def move(treant, tmpdir):
+    """Move a Treant behind its back, returning its new state file."""
+    dest = tmpdir.ensure('elsewhere', dir=True).join(treant.name)
+    shutil.move(treant.abspath, str(dest))
+    return str(dest.join(os.path.basename(treant.filepath)))
+
+
+def test_record_lookup(treant, tmpdir):
+    assert locations.lookup(treant.uuid) == {treant.uuid: treant.filepath}
+
+    statefile = move(treant, tmpdir)
+    assert locations.lookup(treant.uuid, 'missing') == {}
+
+    locations.record(statefile, str(tmpdir.join('notastatefile')))
+    assert locations.lookup(treant.uuid) == {treant.uuid: statefile}
+
+    locations.forget(treant.uuid)
+    assert locations.lookup(treant.uuid) == {}
+
+
+@pytest.mark.parametrize('cachefile', (None, ''))
+def test_disabled(treant, monkeypatch, cachefile):
+    monkeypatch.setattr(locations, 'CACHEFILE', cachefile)
+    assert locations.lookup(treant.uuid) == {}
+    locations.record(treant.filepath)
+
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.delenv('DATREANT_LOCATIONS', raising=False)
+    importlib.reload(locations)
+    assert locations.CACHEFILE is None
+
+    monkeypatch.setenv('DATREANT_LOCATIONS', '/tmp/locations.sqlite')
+    importlib.reload(locations)
+    assert locations.CACHEFILE == '/tmp/locations.sqlite'
+
+
+def test_moves_recorded(treant, tmpdir):
+    treant.name = 'sapling'
+    assert locations.lookup(treant.uuid) == {treant.uuid: treant.filepath}
+
+    treant.location = str(tmpdir.mkdir('grove'))
+    assert locations.lookup(treant.uuid) == {treant.uuid: treant.filepath}
+
+
+def test_found_without_search(treant, tmpdir):
+    oldstatefile = treant.filepath
+
+    # members added by path aren't loaded until accessed
+    b = dtr.Bundle(treant.abspath)
+
+    statefile = move(treant, tmpdir)
+    locations.record(statefile)
+
+    with patch.object(Foxhound, '_find_bundle_members',
+                      side_effect=AssertionError):
+        assert b.filepaths == [statefile]
+
+    assert path2treant(oldstatefile)[0].filepath == statefile
+
+
+def test_foxhound_records(treant, tmpdir):
+    b = dtr.Bundle(treant.abspath)
+    locations.forget(treant.uuid)
+    statefile = move(treant, tmpdir)
+
+    with tmpdir.as_cwd():
+        assert b.filepaths == [statefile]
+
+    assert locations.lookup(treant.uuid) == {treant.uuid: statefile}
@@ -5,10 +5,11 @@
 import pytest
 
 import datreant.core as dtr
-from datreant.core.manipulators import discover
+from datreant.core.manipulators import discover, idiscover
 
 
-def test_discover(tmpdir):
+@pytest.mark.parametrize('workers', (1, 4))
+def test_discover(tmpdir, workers):
     with tmpdir.as_cwd():
 
         ghosts = ('inky', 'blinky', 'pinky', 'clyde')
@@ -18,7 +19,7 @@ def test_discover(tmpdir):
                     'a/very/deep/directory/structure/that/just/keeps/going/' +
                     name)
 
-        b = discover('.')
+        b = discover('.', workers=workers)
 
         assert len(b) == 4
 
@@ -26,7 +27,8 @@ def test_discover(tmpdir):
             assert name in b.names
 
 
-def test_discover_depth(tmpdir):
+@pytest.mark.parametrize('workers', (1, 4))
+def test_discover_depth(tmpdir, workers):
     """Check that using `depth` parameter gives expected result."""
     with tmpdir.as_cwd():
 
@@ -38,15 +40,16 @@ def test_discover_depth(tmpdir):
         for name in ghosts:
             dtr.Treant(name)
 
-        assert len(discover('.', depth=0)) == 0
-        assert len(discover('pinky', depth=0)) == 1
+        assert len(discover('.', depth=0, workers=workers)) == 0
+        assert len(discover('pinky', depth=0, workers=workers)) == 1
 
-        assert len(discover('.', depth=1)) == 1
-        assert len(discover('.', depth=2)) == 3
-        assert len(discover('.', depth=3)) == 4
+        assert len(discover('.', depth=1, workers=workers)) == 1
+        assert len(discover('.', depth=2, workers=workers)) == 3
+        assert len(discover('.', depth=3, workers=workers)) == 4
 
 
-def test_discover_treantdepth(tmpdir):
+@pytest.mark.parametrize('workers', (1, 4))
+def test_discover_treantdepth(tmpdir, workers):
     """Check that using `treantdepth` parameter gives expected result."""
     with tmpdir.as_cwd():
 
@@ -58,19 +61,22 @@ def test_discover_treantdepth(tmpdir):
         for name in ghosts:
             dtr.Treant(name)
 
-        assert len(discover('.', treantdepth=0)) == 2
-        assert len(discover('pinky', treantdepth=0)) == 1
-        assert len(discover('inky', treantdepth=0)) == 1
+        assert len(discover('.', treantdepth=0, workers=workers)) == 2
+        assert len(discover('pinky', treantdepth=0, workers=workers)) == 1
+        assert len(discover('inky', treantdepth=0, workers=workers)) == 1
 
-        assert len(discover('.', treantdepth=1)) == 3
-        assert len(discover('.', treantdepth=2)) == 4
-        assert len(discover('inky', treantdepth=1)) == 2
-        assert len(discover('inky/blinky', treantdepth=1)) == 2
+        assert len(discover('.', treantdepth=1, workers=workers)) == 3
+        assert len(discover('.', treantdepth=2, workers=workers)) == 4
+        assert len(discover('inky', treantdepth=1, workers=workers)) == 2
+        assert len(discover('inky/blinky', treantdepth=1,
+                            workers=workers)) == 2
 
-        assert len(discover('inky/blinky', treantdepth=1)) == 2
+        assert len(discover('inky/blinky', treantdepth=1,
+                            workers=workers)) == 2
 
 
-def test_discover_depth_treantdepth(tmpdir):
+@pytest.mark.parametrize('workers', (1, 4))
+def test_discover_depth_treantdepth(tmpdir, workers):
     """Check that using `treantdepth` and `depth` parameters together gives
         expected result.
     """
@@ -84,15 +90,49 @@ def test_discover_depth_treantdepth(tmpdir):
         for name in ghosts:
             dtr.Treant(name)
 
-        assert len(discover('.', treantdepth=0, depth=0)) == 0
-        assert len(discover('.', treantdepth=0, depth=1)) == 2
-        assert len(discover('pinky', treantdepth=0, depth=0)) == 1
-        assert len(discover('inky', treantdepth=0, depth=2)) == 1
+        assert len(discover('.', treantdepth=0, depth=0,
+                            workers=workers)) == 0
+        assert len(discover('.', treantdepth=0, depth=1,
+                            workers=workers)) == 2
+        assert len(discover('pinky', treantdepth=0, depth=0,
+                            workers=workers)) == 1
+        assert len(discover('inky', treantdepth=0, depth=2,
+                            workers=workers)) == 1
+
+        assert len(discover('.', treantdepth=1, depth=1,
+                            workers=workers)) == 2
+        assert len(discover('inky', treantdepth=1, depth=1,
+                            workers=workers)) == 2
+        assert len(discover('inky', treantdepth=1, depth=0,
+                            workers=workers)) == 1
+
+        assert len(discover('inky', treantdepth=2, workers=workers)) == 3
+        assert len(discover('inky', treantdepth=2, depth=2,
+                            workers=workers)) == 2
+        assert len(discover('inky', treantdepth=2, depth=3,
+                            workers=workers)) == 3
+
+
+@pytest.mark.parametrize('workers', (1, 4))
+def test_idiscover(tmpdir, workers):
+    with tmpdir.as_cwd():
+
+        ghosts = ('inky',
+                  'inky/blinky',
+                  'pinky',
+                  'inky/blinky/nothing/clyde')
+
+        treants = [dtr.Treant(name) for name in ghosts]
+
+        found = idiscover('.', workers=workers)
+        assert not isinstance(found, dtr.Bundle)
+        assert set(found) == set(treants)
 
-        assert len(discover('.', treantdepth=1, depth=1)) == 2
-        assert len(discover('inky', treantdepth=1, depth=1)) == 2
-        assert len(discover('inky', treantdepth=1, depth=0)) == 1
+        records = list(idiscover('.', workers=workers, as_treants=False))
+        assert len(records) == 4
+        for treant in treants:
+            assert (treant.uuid, treant.treanttype,
+                    treant.filepath) in records
 
-        assert len(discover('inky', treantdepth=2)) == 3
-        assert len(discover('inky', treantdepth=2, depth=2)) == 2
-        assert len(discover('inky', treantdepth=2, depth=3)) == 3
+        assert len(list(idiscover('inky', treantdepth=0,
+                                  workers=workers))) == 1
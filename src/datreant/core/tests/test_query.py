@@ -0,0 +1,62 @@
+"""Tests for query expressions.
+
+"""
+
+import pytest
+
+import datreant.core as dtr
+from datreant.core.query import Query
+
+
+@pytest.fixture
+def bundle(tmpdir):
+    with tmpdir.as_cwd():
+        t1 = dtr.Treant('inky', tags=['ghost', 'cyan'],
+                        categories={'speed': 3, 'nice': True,
+                                    'home base': 'corner'})
+        t2 = dtr.Treant('blinky', tags=['ghost', 'red'],
+                        categories={'speed': 5, 'nice': False})
+        t3 = dtr.Treant('pacman', tags=['yellow'],
+                        categories={'speed': 4.5, 'lives': 3})
+    return dtr.Bundle(t1, t2, t3)
+
+
+@pytest.mark.parametrize('expr, names', (
+    ("speed > 3", ['blinky', 'pacman']),
+    ("3 < speed <= 4.5", ['pacman']),
+    ("speed == 5 or lives", ['blinky', 'pacman']),
+    ("not nice", ['blinky', 'pacman']),
+    ("nice == False", ['blinky']),
+    ("nice == None", ['pacman']),
+    ("nice != True and speed >= 0", ['blinky', 'pacman']),
+    ("lives < 10", ['pacman']),
+    ("speed in (3, 5)", ['inky', 'blinky']),
+    ("'ghost' in tags", ['inky', 'blinky']),
+    ("'ghost' not in tags or speed > 4", ['blinky', 'pacman']),
+    ("categories['home base'] == 'corner'", ['inky']),
+    ("speed > -1 and speed > 'fast'", []),
+))
+@pytest.mark.parametrize('workers', (1, 4))
+def test_query(bundle, expr, names, workers):
+    assert bundle.query(expr, workers=workers).names == names
+
+
+def test_query_compiled(bundle):
+    query = Query("'red' in tags and speed > 4")
+    assert query.categories == {'speed'}
+    assert query.tags
+    assert query.mask(bundle) == [False, True, False]
+    assert bundle.query(query).names == ['blinky']
+
+
+@pytest.mark.parametrize('expr', (
+    "speed >",
+    "speed + 1 > 3",
+    "len(tags) > 1",
+    "speed is None",
+    "categories[speed] == 3",
+    "categories[1] == 3",
+))
+def test_query_invalid(expr):
+    with pytest.raises(ValueError):
+        Query(expr)
@@ -2,7 +2,9 @@
 
 """
 
+import asyncio
 import os
+import pickle
 from unittest.mock import patch
 
 import py
@@ -261,6 +263,81 @@ class TestTreant(TestTree):
             assert 'magical' in t2.tags
             assert 'colour' in t2.categories
 
+    def test_transaction(self, basic_treant):
+        t1 = basic_treant
+        backend = t1._backend
+        with patch.object(backend, '_push_state',
+                          wraps=backend._push_state) as push:
+            with t1.transaction():
+                t1.tags.add('wizard')
+                t1.tags.remove('magical')
+                t1.categories['hat'] = 'pointy'
+                t1.categories.remove('colour')
+
+            assert push.call_count == 1
+
+        t2 = dtr.Treant(t1.filepath)
+        assert set(t2.tags) == {'wizard'}
+        assert t2.categories == {'hat': 'pointy'}
+
+    def test_transaction_exception(self, basic_treant):
+        t1 = basic_treant
+        with pytest.raises(ValueError):
+            with t1.transaction():
+                t1.tags.add('wizard')
+                raise ValueError
+
+        assert 'wizard' not in t1.tags
+        assert 'magical' in t1.tags
+
+    def test_from_statefile(self, basic_treant, treantclass, tmpdir):
+        t1 = basic_treant
+        with patch.object(dtr.treants.findTreants, 'glob_treant',
+                          side_effect=AssertionError):
+            t2 = treantclass.from_statefile(t1.filepath)
+            assert t2 == t1
+            assert pickle.loads(pickle.dumps(t1)) == t1
+
+        with pytest.raises(dtr.treants.NoTreantsError):
+            treantclass.from_statefile(t1.abspath, trusted=False)
+        with pytest.raises(dtr.treants.NoTreantsError):
+            treantclass.from_statefile(
+                    str(tmpdir.join(os.path.basename(t1.filepath))),
+                    trusted=False)
+
+        assert treantclass.from_statefile(t1.filepath,
+                                          trusted=False) == t1
+
+    def test_limbs_reopen(self, basic_treant, treantclass):
+        t1 = basic_treant
+
+        # limbs only write to the state file if their data is missing
+        t2 = treantclass.from_statefile(t1.filepath)
+        with patch.object(t2._backend, '_push_state',
+                          side_effect=AssertionError):
+            assert set(t2.tags) == {'magical'}
+            assert t2.categories == {'colour': 'octarine'}
+
+        with t1.transaction():
+            del t1._state['tags']
+
+        t3 = treantclass.from_statefile(t1.filepath)
+        assert set(t3.tags) == set()
+        with t1._read:
+            assert t1._state['tags'] == []
+
+    def test_moved_externally(self, basic_treant, treantclass, tmpdir):
+        t1 = basic_treant
+        moved = tmpdir.ensure('library', dir=True).join('Rincewind')
+        os.rename(t1.abspath, str(moved))
+
+        # the Treant finds its own state file when it goes missing
+        assert 'magical' in t1.tags
+        assert t1.abspath == os.path.join(str(moved), '')
+
+        t1.categories['hat'] = 'pointy'
+        assert treantclass(str(moved)).categories['hat'] == 'pointy'
+
     def test_cmp(self, tmpdir, treantclass):
         """Test the comparison of Treants when sorting"""
         with tmpdir.as_cwd():
@@ -456,9 +533,56 @@ class TestTreant(TestTree):
             with pytest.raises(ValueError):
                 treant.tags.add(tag)
 
+        def test_aget(self, treant):
+            treant.tags.add('lark', 'bark')
+
+            async def main():
+                # concurrent reads of the same Treant take turns
+                return await asyncio.gather(
+                        *[treant.tags.aget() for i in range(10)])
+
+            loop = asyncio.new_event_loop()
+            try:
+                tags = loop.run_until_complete(main())
+            finally:
+                loop.close()
+
+            assert tags == [['bark', 'lark']] * 10
+
+        def test_aget_transaction(self, treant):
+            async def main():
+                # the state file is locked by this thread; reading it from
+                # another would wait forever
+                with treant.transaction():
+                    treant.tags.add('lark')
+                    return await asyncio.wait_for(treant.tags.aget(), 5)
+
+            loop = asyncio.new_event_loop()
+            try:
+                tags = loop.run_until_complete(main())
+            finally:
+                loop.close()
+
+            assert tags == ['lark']
+
     class TestCategories:
         """Test treant categories"""
 
+        def test_aget_transaction(self, treant):
+            async def main():
+                with treant.transaction():
+                    treant.categories['lark'] = 'bark'
+                    return await asyncio.wait_for(
+                            treant.categories.aget('lark'), 5)
+
+            loop = asyncio.new_event_loop()
+            try:
+                value = loop.run_until_complete(main())
+            finally:
+                loop.close()
+
+            assert value == 'bark'
+
         def test_add_categories(self, treant):
             treant.categories.add(marklar=42)
             assert 'marklar' in treant.categories
@@ -474,6 +598,24 @@ class TestTreant(TestTree):
             treant.categories['lark'] = 42
             assert treant.categories['lark'] == 42
 
+        def test_aget(self, treant):
+            treant.categories.add(marklar=42, lark='bark')
+
+            async def main():
+                return await asyncio.gather(
+                        treant.categories.aget(),
+                        treant.categories.aget('lark'),
+                        treant.categories.aget(['marklar', 'lark']))
+
+            loop = asyncio.new_event_loop()
+            try:
+                out = loop.run_until_complete(main())
+            finally:
+                loop.close()
+
+            assert out == [{'marklar': 42, 'lark': 'bark'}, 'bark',
+                           [42, 'bark']]
+
         def test_remove_categories(self, treant):
             treant.categories.add(marklar=42)
             assert 'marklar' in treant.categories
@@ -0,0 +1,116 @@
+"""Tests for watching Bundles.
+
+"""
+
+import os
+import shutil
+import time
+
+import pytest
+from unittest.mock import patch
+
+import datreant.core as dtr
+from datreant.core.findTreants import Foxhound
+from datreant.core.watch import Watcher, _libc
+
+
+def wait_for(condition, timeout=10):
+    start = time.time()
+    while not condition():
+        if time.time() - start > timeout:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture(params=[True, False], ids=['inotify', 'polling'])
+def inotify(request):
+    if request.param and _libc() is None:
+        pytest.skip("inotify not available")
+    return request.param
+
+
+@pytest.fixture
+def bundle(tmpdir):
+    with tmpdir.as_cwd():
+        for name in ('sprout', 'sapling', 'seedling'):
+            dtr.Treant(os.path.join('grove', name))
+        return dtr.Bundle('grove/sprout', 'grove/sapling', 'grove/seedling')
+
+
+def test_moves(bundle, tmpdir, inotify):
+    with bundle.watch(interval=0.05, inotify=inotify) as watcher:
+        assert watcher.running
+        assert ('inotify' in repr(watcher)) == inotify
+
+        moved = tmpdir.join('grove', 'tree')
+        shutil.move(bundle[1].abspath, str(moved))
+
+        assert wait_for(
+            lambda: bundle._state['abspath'][1] == str(moved))
+
+        with patch.object(Foxhound, 'fetch', side_effect=AssertionError):
+            assert bundle.names == ['sprout', 'tree', 'seedling']
+            assert bundle[1].abspath == os.path.join(str(moved), '')
+
+    assert not watcher.running
+
+
+def test_moves_elsewhere(bundle, tmpdir, inotify):
+    # members moved out of sight are searched for from the working directory
+    with tmpdir.as_cwd(), bundle.watch(interval=0.05, inotify=inotify):
+        moved = tmpdir.ensure('forest', 'deep', dir=True).join('sprout')
+        shutil.move(bundle[0].abspath, str(moved))
+
+        assert wait_for(
+            lambda: bundle._state['abspath'][0] == str(moved))
+
+
+def test_changes_invalidate(bundle, inotify):
+    member = bundle[2]
+    assert set(member.tags) == set()
+
+    with bundle.watch(interval=0.05, inotify=inotify):
+        dtr.Treant(member.filepath).tags.add('leafy')
+
+        assert wait_for(lambda: member._backend._stamp is None)
+        assert set(member.tags) == {'leafy'}
+
+
+def test_inotify_unavailable(bundle):
+    with patch('datreant.core.watch._libc', return_value=None):
+        with pytest.raises(OSError):
+            Watcher(bundle, inotify=True)
+
+        assert repr(Watcher(bundle)).endswith('polling)>')
+
+
+def test_removed_while_relocating(bundle, tmpdir):
+    # members removed between checking and relocating aren't added back
+    watcher = Watcher(bundle, inotify=False)
+    member = bundle[1]
+    moved = tmpdir.join('grove', 'tree')
+    shutil.move(member.abspath, str(moved))
+
+    bundle.remove(member)
+    watcher._relocate({member.uuid: member.treanttype}, [str(moved)])
+
+    assert bundle._position(member.uuid) is None
+    assert bundle.names == ['sprout', 'seedling']
+
+
+def test_errors_logged(bundle, caplog):
+    # unexpected errors are logged, and don't stop the watcher
+    calls = []
+
+    def check(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise ValueError("bad state file")
+
+    with bundle.watch(interval=0.01, inotify=False) as watcher:
+        with patch.object(watcher, '_check', side_effect=check):
+            assert wait_for(lambda: len(calls) > 1)
+            assert watcher.running
+
+    assert "bad state file" in caplog.text
@@ -2,17 +2,21 @@
 Treants: the organizational units for :mod:`datreant`.
 
 """
+import copy
+import errno
 import functools
 import os
+from contextlib import contextmanager, ExitStack
 from uuid import uuid4
 
 import six
 from pathlib2 import Path
 
 from . import _TREANTS, _TREELIMBS, _LIMBS
-from . import findTreants
+from . import findTreants, locations
 from .backends.statefiles import treantfile, TreantFile
 from .collections import Bundle
+from .index import update_index, remove_from_index
 from .trees import Tree
 from .util import makedirs
 
@@ -72,6 +76,14 @@ class Treant(six.with_metaclass(_Treantmeta, Tree)):
     _treanttype = 'Treant'
     _backendclass = TreantFile
 
+    # maximum time, in seconds, spent searching for the state file if it
+    # goes missing
+    _searchtime = 10
+
+    # name of JSON codec for state file, such as ``'json'`` for the standard
+    # library; ``None`` uses the fastest installed
+    _jsoncodec = None
+
     def __init__(self, treant, new=False, categories=None, tags=None):
         # if given a Tree, get path out of it
         if isinstance(treant, Tree):
@@ -85,6 +97,47 @@ class Treant(six.with_metaclass(_Treantmeta, Tree)):
             except NoTreantsError:
                 self._generate(treant, categories=categories, tags=tags)
 
+    @classmethod
+    def from_statefile(cls, statefile, trusted=True):
+        """Get Treant from the path to its state file.
+
+        This is the cheapest way to reopen a Treant whose state file is
+        known: its directory isn't searched for state files, and the state
+        file isn't read or written until the Treant's contents are used.
+
+        Parameters
+        ----------
+        statefile : str
+            Path to the state file of an existing Treant.
+        trusted : bool
+            If ``True``, `statefile` is assumed to be an existing state file
+            without checking. If ``False``, a :exc:`NoTreantsError` is raised
+            if it isn't.
+
+        Returns
+        -------
+        treant : Treant
+            The Treant with the given state file.
+
+        """
+        if not trusted and not (findTreants.parse_statefilename(statefile)
+                                and os.path.isfile(statefile)):
+            raise NoTreantsError("No Treant state file at "
+                                 "'{}'".format(statefile))
+
+        return cls._from_statefile(statefile)
+
+    @classmethod
+    def _from_statefile(cls, statefile):
+        """Get Treant for an existing state file, without searching for it or
+        initializing its contents.
+
+        """
+        treant = cls.__new__(cls)
+        treant._backend = treantfile(statefile)
+
+        return treant
+
     def attach(self, *limbname):
         """Attach limbs by name to this Treant.
 
@@ -100,17 +153,74 @@ class Treant(six.with_metaclass(_Treantmeta, Tree)):
             else:
                 self._attach_limb(limb)
 
+    @contextmanager
+    def transaction(self):
+        """Context manager for making many changes to this Treant at once.
+
+        An exclusive lock is held on the Treant's state file for the duration
+        of the block, and the state file is written only once on exit. If an
+        exception is raised within the block, no changes are written.
+
+        Example::
+
+            with t.transaction():
+                t.tags.add('hot', 'dry')
+                t.categories['temperature'] = 350
+
+        """
+        with self._write:
+            yield self
+
     @property
     def _state(self):
         return self._backend._state
 
     @property
     def _read(self):
-        return self._backend.read()
+        return self._access('read')
 
     @property
     def _write(self):
-        return self._backend.write()
+        return self._access('write')
+
+    @contextmanager
+    def _access(self, mode):
+        """Lock the state file for reading or writing with the backend.
+
+        If the state file has gone missing, the Treant has probably been moved
+        by another process; it is then tracked down and loaded from its new
+        location.
+
+        """
+        with ExitStack() as stack:
+            try:
+                state = stack.enter_context(getattr(self._backend, mode)())
+            except (IOError, OSError) as e:
+                if e.errno != errno.ENOENT or not self._relocate():
+                    raise
+                state = stack.enter_context(getattr(self._backend, mode)())
+
+            yield state
+
+    def _relocate(self):
+        """Find the Treant's state file after it has moved, and load it from
+        its new location.
+
+        :Returns:
+            *found*
+                ``True`` if the state file was found
+        """
+        oldstatefile = self.filepath
+        paths = {'abspath': [os.path.dirname(oldstatefile)]}
+        foxhound = findTreants.Foxhound(self, [self.uuid], paths,
+                                        timeout=self._searchtime)
+        statefile = foxhound.fetch(as_treants=False)[self.uuid]
+        if statefile is None:
+            return False
+
+        self._regenerate(statefile)
+        self._reindex(oldstatefile)
+        return True
 
     def __repr__(self):
         return "<{}: '{}'>".format(self._treanttype, self.name)
@@ -119,7 +229,7 @@ class Treant(six.with_metaclass(_Treantmeta, Tree)):
         return self.filepath
 
     def __setstate__(self, state):
-        self.__init__(state)
+        self._backend = treantfile(state)
 
     def __hash__(self):
         return hash(self.uuid)
@@ -178,6 +288,8 @@ class Treant(six.with_metaclass(_Treantmeta, Tree)):
             self.categories.add(categories)
             self.tags.add(tags)
 
+        locations.record(statefile)
+
     def _regenerate(self, treant, categories=None, tags=None):
         """Re-generate existing Treant object.
 
@@ -225,6 +337,16 @@ class Treant(six.with_metaclass(_Treantmeta, Tree)):
         else:
             raise NoTreantsError('No Treants found in path.')
 
+    def _reindex(self, oldstatefile):
+        """Update indexes and the location cache after the state file has
+        moved from `oldstatefile`.
+
+        """
+        locations.record(self.filepath)
+        remove_from_index(oldstatefile)
+        with self._read:
+            update_index(self.filepath, self._state)
+
     @property
     def name(self):
         """The name of the Treant.
@@ -249,10 +371,13 @@ class Treant(six.with_metaclass(_Treantmeta, Tree)):
         newdir = os.path.join(os.path.dirname(olddir), name)
         statefile = os.path.join(newdir,
                                  findTreants.statefilename(
-                                     self._treanttype, self.uuid))
+                                     self._treanttype, self.uuid,
+                                     self._backend._ext))
 
+        oldstatefile = self.filepath
         os.rename(olddir, newdir)
         self._regenerate(statefile)
+        self._reindex(oldstatefile)
 
     @property
     def uuid(self):
@@ -309,9 +434,12 @@ class Treant(six.with_metaclass(_Treantmeta, Tree)):
         newpath = os.path.join(value, self.name)
         statefile = os.path.join(newpath,
                                  findTreants.statefilename(
-                                     self._treanttype, self.uuid))
+                                     self._treanttype, self.uuid,
+                                     self._backend._ext))
+        oldstatefile = self.filepath
         os.rename(oldpath, newpath)
         self._regenerate(statefile)
+        self._reindex(oldstatefile)
 
     @property
     def path(self):
@@ -336,6 +464,7 @@ class Treant(six.with_metaclass(_Treantmeta, Tree)):
 
     @property
     def state(self):
+        # the state is kept between reads; hand out a copy
         with self._read:
-            state = self._state
+            state = copy.deepcopy(self._state)
         return state
@@ -1,3 +1,4 @@
+import functools
 import os
 
 from pathlib2 import Path
@@ -32,3 +33,49 @@ def relpath(path):
         return path
     else:
         return os.path.relpath(path)
+
+
+def run_async(function, *args, **kwargs):
+    """Run a blocking function in a thread, without blocking the event loop.
+
+    The function is run in the default executor of the current event loop;
+    call from within a coroutine running on the loop.
+
+    :Arguments:
+        *function*
+            function to run; `args` and `kwargs` are passed to it
+
+    :Returns:
+        *future*
+            :mod:`asyncio` future giving the result of the function
+    """
+    import asyncio
+
+    loop = asyncio.get_event_loop()
+    return loop.run_in_executor(None,
+                                functools.partial(function, *args, **kwargs))
+
+
+def run_inline(function, *args, **kwargs):
+    """Run a function right away, giving its result as a completed future.
+
+    Used in place of :func:`run_async` when the function can't be run in
+    another thread, such as when it needs locks held by the calling thread.
+
+    :Arguments:
+        *function*
+            function to run; `args` and `kwargs` are passed to it
+
+    :Returns:
+        *future*
+            completed :mod:`asyncio` future giving the result of the
+            function, or the exception it raised
+    """
+    import asyncio
+
+    future = asyncio.get_event_loop().create_future()
+    try:
+        future.set_result(function(*args, **kwargs))
+    except Exception as e:
+        future.set_exception(e)
+    return future
@@ -0,0 +1,465 @@
+"""
+Watching the members of a Bundle for moves and changes to their state files.
+
+A :class:`Watcher` keeps a Bundle's member table current from a background
+thread, so that members that have moved are found before they are next
+accessed, rather than by a search when they are. Cached state of members
+whose state files change is also invalidated as changes are seen.
+
+On Linux, inotify is used through :mod:`ctypes` to watch the directories of
+members and their parents; elsewhere, or if inotify is unavailable, state
+files are polled for changes instead.
+
+"""
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+
+from . import findTreants, locations
+
+# inotify event masks; see inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+         IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF |
+         IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT = struct.Struct('iIII')
+
+logger = logging.getLogger(__name__)
+
+
+def _libc():
+    """Get the C library if it provides inotify, or ``None``.
+
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError):
+        return None
+
+    return libc
+
+
+class _Inotify(object):
+    """Minimal interface to an inotify instance watching directories.
+
+    """
+    def __init__(self, libc):
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+
+        # watch descriptors to paths, and paths to watch descriptors
+        self._watches = dict()
+        self._paths = dict()
+
+    def watch(self, paths):
+        """Watch exactly the given directories.
+
+        """
+        paths = set(paths)
+        for path in list(self._paths):
+            if path not in paths:
+                wd = self._paths.pop(path)
+                if self._watches.get(wd) == path:
+                    del self._watches[wd]
+                    self._libc.inotify_rm_watch(self.fd, wd)
+
+        for path in paths.difference(self._paths):
+            wd = self._libc.inotify_add_watch(
+                    self.fd, os.fsencode(path), _MASK)
+            if wd < 0:
+                continue
+
+            # a directory that moved keeps its watch descriptor
+            old = self._watches.get(wd)
+            if old is not None:
+                self._paths.pop(old, None)
+            self._watches[wd] = path
+            self._paths[path] = wd
+
+    def read(self, timeout):
+        """Wait up to `timeout` seconds for events.
+
+        Returns
+        -------
+        events : list
+            Tuples of ``(path, mask, name)``, giving the watched directory,
+            event mask, and name of the entry within it the event is for
+            (empty for the directory itself).
+
+        """
+        ready = select.select([self.fd], [], [], timeout)[0]
+        if not ready:
+            return []
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+
+        events = list()
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_IGNORED:
+                path = self._watches.pop(wd, None)
+                if path is not None and self._paths.get(path) == wd:
+                    del self._paths[path]
+                continue
+
+            path = self._watches.get(wd)
+            if path is not None or mask & IN_Q_OVERFLOW:
+                events.append((path, mask, os.fsdecode(name)))
+
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _get_stamp(statefile):
+    try:
+        st = os.stat(statefile)
+    except OSError:
+        return None
+
+    return (getattr(st, 'st_mtime_ns', st.st_mtime), st.st_size, st.st_ino)
+
+
+class Watcher(object):
+    """Keeps the member table of a Bundle current as members move or their
+    state files change.
+
+    Changes are looked for in a background thread between calls to
+    :meth:`start` and :meth:`stop`; a Watcher can also be used as a context
+    manager. Members that have moved are looked for first in directories that
+    appeared, then in the location cache, and finally with a
+    :class:`~datreant.core.findTreants.Foxhound`; members that can't be
+    found aren't searched for again until there are new directories to look
+    in.
+
+    Parameters
+    ----------
+    bundle : Bundle
+        Bundle to watch.
+    interval : float
+        Seconds between checks when polling, or between updates of which
+        directories are watched when using inotify.
+    inotify : bool
+        Whether to use inotify; if ``None``, inotify is used if available.
+
+    Raises
+    ------
+    OSError
+        If `inotify` is ``True`` but it isn't available.
+
+    """
+    def __init__(self, bundle, interval=1.0, inotify=None):
+        self.bundle = bundle
+        self.interval = interval
+
+        self._libc = _libc() if inotify is not False else None
+        if inotify and self._libc is None:
+            raise OSError("inotify is not available")
+
+        self._inotify = None
+        self._thread = None
+        self._stop = threading.Event()
+
+        # stamps of member state files, and uuids of members that couldn't be
+        # found
+        self._stamps = dict()
+        self._lost = set()
+
+    def __repr__(self):
+        return "<Watcher({}, {})>".format(
+                self.bundle, 'inotify' if self._libc else 'polling')
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def running(self):
+        """``True`` if the Watcher is running.
+
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start watching.
+
+        Returns
+        -------
+        Watcher
+            This Watcher.
+
+        """
+        if self.running:
+            return self
+
+        if self._libc is not None:
+            self._inotify = _Inotify(self._libc)
+            self._inotify.watch(self._dirs())
+
+        self._check()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        """Stop watching.
+
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._inotify is None:
+                    self._stop.wait(self.interval)
+                    self._check()
+                else:
+                    self._handle(self._inotify.read(self.interval))
+                    self._inotify.watch(self._dirs())
+            except (OSError, IOError):
+                # the filesystem changed under us; try again next time
+                pass
+            except Exception:
+                # keep watching; a failure for some members shouldn't stop
+                # the others from being kept current
+                logger.exception("Error while watching %r", self.bundle)
+
+    def _dirs(self):
+        """Get the directories to watch: those of members, and their parents.
+
+        """
+        with self.bundle._lock:
+            abspaths = list(self.bundle._state['abspath'])
+
+        dirs = set()
+        for abspath in abspaths:
+            dirs.add(abspath)
+            dirs.add(os.path.dirname(abspath))
+
+        return dirs
+
+    def _handle(self, events):
+        """Check members affected by inotify events.
+
+        """
+        if not events:
+            return
+
+        paths = set()
+        candidates = set()
+        for path, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # events were lost; check everything
+                return self._check(candidates=self._dirs())
+
+            full = os.path.join(path, name) if name else path
+            paths.update((path, full))
+            if mask & IN_ISDIR and mask & (IN_MOVED_TO | IN_CREATE):
+                candidates.add(full)
+
+        with self.bundle._lock:
+            members = list(zip(self.bundle._state['uuid'],
+                               self.bundle._state['abspath']))
+
+        prefixes = tuple(os.path.join(path, '') for path in paths)
+        uuids = set(uuid for uuid, abspath in members
+                    if abspath in paths or abspath.startswith(prefixes))
+
+        if uuids or candidates:
+            self._check(uuids, candidates)
+
+    def _check(self, uuids=None, candidates=()):
+        """Check the state files of members, invalidating cached state of
+        those that changed and finding those that moved.
+
+        Parameters
+        ----------
+        uuids : set
+            Uuids of members to check; all members if ``None``.
+        candidates : iterable
+            Directories that members may have moved into.
+
+        """
+        with self.bundle._lock:
+            state = self.bundle._state
+            members = list(zip(state['uuid'], state['treanttype'],
+                               state['abspath']))
+
+            # directories that appeared may hold members not found before
+            lost = dict()
+            if candidates:
+                for uuid in self._lost:
+                    position = self.bundle._position(uuid)
+                    if position is not None:
+                        lost[uuid] = state['treanttype'][position]
+
+        missing = dict()
+        for uuid, treanttype, abspath in members:
+            if uuids is not None and uuid not in uuids:
+                continue
+
+            stamp = _get_stamp(self._statefile(uuid, treanttype, abspath))
+            if stamp is None:
+                missing[uuid] = treanttype
+            elif stamp != self._stamps.get(uuid):
+                if uuid in self._stamps:
+                    self._invalidate(uuid)
+                self._stamps[uuid] = stamp
+
+        for uuid, treanttype in lost.items():
+            missing.setdefault(uuid, treanttype)
+
+        if missing:
+            self._relocate(missing, candidates)
+
+    def _statefile(self, uuid, treanttype, abspath):
+        member = self.bundle._cache.get(uuid)
+        if member and os.path.dirname(member.filepath) == abspath:
+            return member.filepath
+
+        from . import _TREANTS
+        treantclass = _TREANTS.get(treanttype, _TREANTS['Treant'])
+        return os.path.join(abspath, findTreants.statefilename(
+            treanttype, uuid, treantclass._backendclass._ext))
+
+    def _invalidate(self, uuid):
+        """Make a cached member deserialize its state file on next read.
+
+        """
+        member = self.bundle._cache.get(uuid)
+        if member is not None:
+            member._backend._stamp = None
+
+    def _relocate(self, missing, candidates=()):
+        """Find members that moved, and update their locations.
+
+        Members removed from the Bundle in the meantime are skipped.
+
+        Parameters
+        ----------
+        missing : dict
+            Treant types of members to find, with uuids as keys.
+        candidates : iterable
+            Directories to look in first.
+
+        """
+        found = dict()
+
+        def match(statefiles):
+            found.update((uuid, statefile) for uuid, statefile
+                         in statefiles.items() if uuid in missing)
+
+        # directories that appeared may hold any member not yet found
+        for candidate in candidates:
+            for root, dirs, files in os.walk(candidate):
+                match(findTreants.Foxhound._statefiles(files, root))
+
+        # members not searched for before were most likely renamed within
+        # their parent directory; members already searched for aren't
+        # searched for again
+        with self.bundle._lock:
+            abspaths = dict()
+            for uuid in missing:
+                position = self.bundle._position(uuid)
+                if position is not None:
+                    abspaths[uuid] = self.bundle._state['abspath'][position]
+
+        new = [uuid for uuid in missing if uuid in abspaths and
+               uuid not in found and uuid not in self._lost]
+        parents = set(os.path.dirname(abspaths[uuid]) for uuid in new)
+        for parent in parents:
+            try:
+                entries = list(os.scandir(parent))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir():
+                    match(findTreants.Foxhound._statefiles(
+                        findTreants.glob_treant(entry.path)))
+
+        locations.record(*found.values())
+        found.update(locations.lookup(*[uuid for uuid in missing
+                                        if uuid not in found]))
+
+        remaining = [uuid for uuid in new if uuid not in found]
+        if remaining:
+            foxhound = findTreants.Foxhound(
+                    self.bundle, remaining, {'abspath': sorted(parents)},
+                    timeout=self.bundle.searchtime,
+                    workers=self.bundle._workers())
+            found.update((uuid, statefile) for uuid, statefile
+                         in foxhound.fetch(as_treants=False).items()
+                         if statefile)
+
+        with self.bundle._lock:
+            # members removed while searching mustn't be added back
+            for uuid in list(missing):
+                if self.bundle._position(uuid) is None:
+                    del missing[uuid]
+                    found.pop(uuid, None)
+                    self._stamps.pop(uuid, None)
+                    self._lost.discard(uuid)
+
+            for uuid, statefile in found.items():
+                self.bundle._add_member(uuid, missing[uuid],
+                                        os.path.dirname(statefile))
+                self.bundle._cache.pop(uuid, None)
+                self._stamps[uuid] = _get_stamp(statefile)
+
+        self._lost.difference_update(found)
+        self._lost.update(uuid for uuid in missing if uuid not in found)